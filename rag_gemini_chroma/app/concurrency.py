@@ -0,0 +1,42 @@
+import functools
+
+import anyio
+from anyio import to_thread
+
+from app.config import (
+    ADMIN_CONCURRENCY,
+    GENERATE_CONCURRENCY,
+    INGEST_CONCURRENCY,
+    RETRIEVE_CONCURRENCY,
+)
+
+# Each pool gets its own limit so a long upload can't use up the threads
+# that queries need, and slow Gemini calls can't starve retrieval.
+POOL_LIMITS = {
+    "ingest": INGEST_CONCURRENCY,      # PDF parsing, chunk embedding, Chroma writes
+    "retrieve": RETRIEVE_CONCURRENCY,  # question embedding, Chroma queries
+    "generate": GENERATE_CONCURRENCY,  # in-flight Gemini calls (async or threaded)
+    "admin": ADMIN_CONCURRENCY,        # summary / clear
+}
+
+_limiters: dict[str, anyio.CapacityLimiter] = {}
+
+
+def pool_limiter(pool: str) -> anyio.CapacityLimiter:
+    # Created lazily so the limiter binds to the running event loop
+    if pool not in _limiters:
+        _limiters[pool] = anyio.CapacityLimiter(max(1, POOL_LIMITS[pool]))
+    return _limiters[pool]
+
+
+async def run_blocking(pool: str, func, *args, **kwargs):
+    """
+    Run a blocking call on a worker thread without stalling the event loop.
+    At most POOL_LIMITS[pool] calls from the same pool run at once; the
+    rest wait here.
+    """
+    return await to_thread.run_sync(
+        functools.partial(func, *args, **kwargs),
+        limiter=pool_limiter(pool),
+    )
+
@@ -5,9 +5,151 @@ load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-CHROMA_DB_DIR = "chroma_db"
+CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "chroma_db")
 COLLECTION_NAME = "rag_documents"
 
 USE_CHROMA_HTTP = os.getenv("USE_CHROMA_HTTP", "false").lower() == "true"
 CHROMA_HOST = os.getenv("CHROMA_HOST", "127.0.0.1")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+
+# Vector store backend: "chroma" (CHROMA_DB_DIR or the Chroma server) or
+# "local", an in-process memory-mapped index in LOCAL_INDEX_DIR (see
+# app/rag/local_index.py). Processes on one machine opening the same
+# directory share a single page-cached copy of the vectors.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "local_index")
+
+# The stats and BM25 sidecars describe one store's contents, so with the
+# local backend they default to living inside its directory
+_SIDECAR_DIR = LOCAL_INDEX_DIR if VECTOR_BACKEND == "local" else ""
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Chunks embedded and written per batch during streaming ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Page text extraction: PDFs with at least PDF_PARALLEL_MIN_PAGES pages are
+# split into shards of PDF_PAGES_PER_SHARD pages across one long-lived process
+# pool of PDF_EXTRACT_WORKERS workers
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_PAGES_PER_SHARD = int(os.getenv("PDF_PAGES_PER_SHARD", "8"))
+
+# Max concurrent blocking calls per worker-thread pool (see app/concurrency.py)
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+RETRIEVE_CONCURRENCY = int(os.getenv("RETRIEVE_CONCURRENCY", "32"))
+GENERATE_CONCURRENCY = int(os.getenv("GENERATE_CONCURRENCY", "16"))
+ADMIN_CONCURRENCY = int(os.getenv("ADMIN_CONCURRENCY", "2"))
+
+# Semantic answer cache (see app/rag/answer_cache.py)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Persistent content-addressed embedding cache (see app/rag/embedding_cache.py)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "embedding_cache.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "500000"))
+
+# Default chunking for uploads and re-indexing
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+# Extracted per-page text kept per source so it can be re-chunked without the PDF
+PAGE_STORE_DIR = os.getenv("PAGE_STORE_DIR", "page_store")
+
+# Per-source chunk/char totals maintained at ingest and clear time
+STATS_DB_PATH = os.getenv("STATS_DB_PATH", os.path.join(_SIDECAR_DIR, "collection_stats.sqlite3"))
+
+# Load models and open Chroma in the background at startup; /ready reports when done
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Embedding backend: "torch" (sentence-transformers) or "onnx" (onnxruntime,
+# model exported with `python -m app.rag.onnx_embedder export`)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("onnx_models", "all-MiniLM-L6-v2"))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "false").lower() == "true"
+# 0 lets onnxruntime pick (one thread per physical core)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+# Cross-request micro-batching of query embeddings (see app/rag/embed_scheduler.py)
+EMBED_SCHEDULER_ENABLED = os.getenv("EMBED_SCHEDULER_ENABLED", "true").lower() == "true"
+EMBED_SCHEDULER_MAX_BATCH = int(os.getenv("EMBED_SCHEDULER_MAX_BATCH", "32"))
+
+# /query/batch limits: questions per request and Gemini calls in flight per batch
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "1000"))
+QUERY_BATCH_GENERATE_CONCURRENCY = int(os.getenv("QUERY_BATCH_GENERATE_CONCURRENCY", "8"))
+
+# Hybrid retrieval: BM25 over chunk text (SQLite FTS5) fused with dense
+# results by reciprocal rank fusion
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(_SIDECAR_DIR, "lexical_index.sqlite3"))
+LEXICAL_INDEX_MMAP_BYTES = int(os.getenv("LEXICAL_INDEX_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# Optional cross-encoder rerank of a wider candidate pool (see app/rag/reranker.py)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_POOL_SIZE = int(os.getenv("RERANK_POOL_SIZE", "30"))
+RERANK_KEEP = int(os.getenv("RERANK_KEEP", "3"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_MAX_MS = float(os.getenv("RERANK_MAX_MS", "300"))
+RERANK_CACHE_MAX_ENTRIES = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", "20000"))
+
+# Prompt context assembly (see app/rag/context_builder.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+# Chunking strategy: "fixed" (character windows), "recursive" (character
+# windows cut at paragraph/line/sentence/word separators) or "sentence"
+# (sentence-aligned, sized in embedding-model tokens)
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "fixed").lower()
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "20"))
+
+# Gemini client (see app/rag/gemini_client.py). TIMEOUT bounds one
+# attempt, DEADLINE the whole call including retries and backoff.
+# GEMINI_FAKE swaps in the offline stand-in from app/rag/fake_gemini.py.
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-3-flash-preview")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "60"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "0.5"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "8"))
+GEMINI_HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() == "true"
+GEMINI_HEDGE_QUANTILE = float(os.getenv("GEMINI_HEDGE_QUANTILE", "0.95"))
+GEMINI_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("GEMINI_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+GEMINI_FAKE = os.getenv("GEMINI_FAKE", "false").lower() == "true"
+GEMINI_FAKE_LATENCY_MS = float(os.getenv("GEMINI_FAKE_LATENCY_MS", "50"))
+
+# Background ingestion jobs (see app/ingestion/jobs.py). Every upload is
+# saved to JOB_UPLOAD_DIR before it is accepted and kept until its job
+# finishes, so queued and interrupted jobs survive a restart.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "ingest_jobs.sqlite3")
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", "job_uploads")
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+
+# Bulk directory ingestion CLI (see app/ingestion/bulk.py)
+BULK_INGEST_WORKERS = int(os.getenv("BULK_INGEST_WORKERS", str(os.cpu_count() or 1)))
+BULK_INGEST_BATCH_SIZE = int(os.getenv("BULK_INGEST_BATCH_SIZE", "2048"))
+
+# Uploads: anything larger than MAX_UPLOAD_BYTES is rejected with 413.
+# Uploads up to UPLOAD_IN_MEMORY_MAX_BYTES are also handed to the job
+# worker in memory and parsed from there, with at most
+# UPLOAD_MEMORY_TOTAL_BYTES held across queued jobs.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_IN_MEMORY_MAX_BYTES = int(os.getenv("UPLOAD_IN_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))
+UPLOAD_MEMORY_TOTAL_BYTES = int(os.getenv("UPLOAD_MEMORY_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+# Approximate IVF search, once built with `python -m app.rag.local_index
+# build-ivf`, for collections of at least LOCAL_INDEX_IVF_MIN_ROWS rows;
+# smaller collections are always searched exactly.
+LOCAL_INDEX_IVF = os.getenv("LOCAL_INDEX_IVF", "false").lower() == "true"
+LOCAL_INDEX_IVF_MIN_ROWS = int(os.getenv("LOCAL_INDEX_IVF_MIN_ROWS", "200000"))
+LOCAL_INDEX_IVF_NPROBE = int(os.getenv("LOCAL_INDEX_IVF_NPROBE", "16"))
+# Rewrite the local index without deleted rows once they make up this
+# fraction of it (also `python -m app.rag.local_index compact`); 0 disables
+LOCAL_INDEX_COMPACT_DEAD_FRACTION = float(os.getenv("LOCAL_INDEX_COMPACT_DEAD_FRACTION", "0.25"))
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.config import BULK_INGEST_BATCH_SIZE, BULK_INGEST_WORKERS
+from app.ingestion.ingest import ingest_pdf
+from app.ingestion.page_store import record_pages
+from app.ingestion.pdf_loader import Chunk, iter_chunks, iter_pdf_pages, process_context
+from app.rag.vectorstore import delete_ids, iter_source_records
+
+DEFAULT_CHECKPOINT = "bulk_ingest_checkpoint.jsonl"
+
+
+def _parse(path: str, source: str) -> tuple[str, int, list[Chunk]]:
+    """
+    Runs in a worker process: extract and chunk one PDF the same way
+    /upload does, keeping its page text for later re-chunking.
+    Each worker handles one file, so extraction itself stays serial.
+    """
+    page_count = 0
+
+    def counted(pages):
+        nonlocal page_count
+        for page in pages:
+            page_count += 1
+            yield page
+
+    pages = record_pages(counted(iter_pdf_pages(path, workers=1)), source)
+    chunks = [chunk._replace(source=source) for chunk in iter_chunks(pages)]
+    return source, page_count, chunks
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines log of per-file progress. A file is "started"
+    once its chunks begin streaming to the vector store and "done" once
+    all of them are written. A file left started by an interrupted run
+    may have partial chunks, which are removed before it is redone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started: set[str] = set()
+        self.done: set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    (self.done if entry["state"] == "done" else self.started).add(entry["source"])
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def interrupted(self) -> set[str]:
+        return self.started - self.done
+
+    def record(self, source: str, state: str, **details):
+        with self._lock:
+            self._file.write(json.dumps({"source": source, "state": state, **details}) + "\n")
+            self._file.flush()
+            (self.done if state == "done" else self.started).add(source)
+
+    def close(self):
+        self._file.close()
+
+
+def find_pdfs(root: Path) -> list[tuple[str, str]]:
+    """
+    (path, source) for every PDF under root; the source is the path
+    relative to root, so same-named files in different folders stay apart
+    """
+    return [
+        (str(path), path.relative_to(root).as_posix())
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.suffix.lower() == ".pdf"
+    ]
+
+
+class BulkIngester:
+    def __init__(self, checkpoint: Checkpoint, workers: int, batch_size: int, report_every: float = 10.0):
+        self.checkpoint = checkpoint
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.report_every = report_every
+
+        self.files = 0
+        self.failed = 0
+        self.pages = 0
+        self.chunks_fed = 0
+        self.chunks_written = 0
+        self._pending: deque[tuple[str, int, int]] = deque()  # (source, pages, chunk count end)
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    def _parsed(self, files: list[tuple[str, str]]) -> Iterator[tuple[str, int, list[Chunk]]]:
+        """
+        Parse files across a process pool, yielding each as it finishes.
+        Only a fixed number are in flight, so parsed chunks never pile up
+        ahead of the embedder.
+        """
+        queue = deque(files)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context()) as pool:
+            in_flight = {}
+            while queue or in_flight:
+                while queue and len(in_flight) < self.workers * 2:
+                    path, source = queue.popleft()
+                    in_flight[pool.submit(_parse, path, source)] = source
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"{source}: failed: {e}", file=sys.stderr)
+
+    def _chunks(self, files: list[tuple[str, str]]) -> Iterator[Chunk]:
+        for source, page_count, chunks in self._parsed(files):
+            self.checkpoint.record(source, "started")
+            with self._lock:
+                self.chunks_fed += len(chunks)
+                self._pending.append((source, page_count, self.chunks_fed))
+            self._complete_written()
+            yield from chunks
+
+    def _on_batch(self, count: int):
+        # Called from the ingest writer thread after each upsert
+        with self._lock:
+            self.chunks_written += count
+        self._complete_written()
+        self._maybe_report()
+
+    def _complete_written(self):
+        # Batches are written in input order, so a file is complete once
+        # the written total reaches the end of its chunks
+        while True:
+            with self._lock:
+                if not self._pending or self._pending[0][2] > self.chunks_written:
+                    return
+                source, page_count, end = self._pending.popleft()
+                self.files += 1
+                self.pages += page_count
+            self.checkpoint.record(source, "done", pages=page_count)
+
+    def _rates(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "pages": self.pages,
+            "chunks": self.chunks_written,
+            "seconds": round(elapsed, 1),
+            "pages_per_second": round(self.pages / elapsed, 1) if elapsed else 0.0,
+            "chunks_per_second": round(self.chunks_written / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _maybe_report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            rates = self._rates()
+            print(
+                f"{rates['files']} files, {rates['pages_per_second']} pages/s, "
+                f"{rates['chunks_per_second']} chunks/s",
+                file=sys.stderr,
+            )
+
+    def run(self, files: list[tuple[str, str]]) -> dict:
+        # Partial chunks from an interrupted run would otherwise be duplicated
+        for source in self.checkpoint.interrupted():
+            ids = [chunk_id for records in iter_source_records(source, include=()) for chunk_id in records["ids"]]
+            delete_ids(ids)
+
+        todo = [(path, source) for path, source in files if source not in self.checkpoint.done]
+        ingest_pdf(
+            text_chunks=self._chunks(todo),
+            source="unknown",  # every chunk carries its own source
+            batch_size=self.batch_size,
+            on_batch=self._on_batch,
+        )
+        self._complete_written()  # trailing files that produced no chunks
+        return self._rates()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest every PDF under a directory, resumably")
+    parser.add_argument("directory")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress log used to resume")
+    parser.add_argument("--workers", type=int, default=BULK_INGEST_WORKERS, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=BULK_INGEST_BATCH_SIZE, help="chunks per embed/upsert batch")
+    args = parser.parse_args()
+
+    root = Path(args.directory)
+    files = find_pdfs(root)
+    checkpoint = Checkpoint(args.checkpoint)
+    print(f"{len(files)} PDFs found, {len(checkpoint.done)} already done", file=sys.stderr)
+
+    try:
+        rates = BulkIngester(checkpoint, workers=args.workers, batch_size=args.batch_size).run(files)
+    finally:
+        checkpoint.close()
+    print(json.dumps(rates, indent=2))
+
+
+if __name__ == "__main__":
+    main()
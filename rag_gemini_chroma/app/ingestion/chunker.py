@@ -1,8 +1,7 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.ingestion.chunking import PageText, iter_chunks
 
 def chunk_text(text: str):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=150
-    )
-    return splitter.split_text(text)
+    return [
+        chunk.text
+        for chunk in iter_chunks([PageText(page=1, offset=0, text=text)], chunk_size=800, overlap=150, strategy="recursive")
+    ]
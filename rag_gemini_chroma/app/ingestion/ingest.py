@@ -1,27 +1,89 @@
 import uuid
-from app.rag.embeddings import embed_text
-from app.rag.vectorstore import add_documents
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-def ingest_pdf(text_chunks: list[str], source: str):
-    """
-    Takes extracted PDF text chunks and stores them in ChromaDB
-    """
+import numpy as np
+
+from app.config import INGEST_BATCH_SIZE
+from app.ingestion.pdf_loader import Chunk
+from app.metrics import CHUNKS_INGESTED
+from app.rag.embeddings import embed_texts
+from app.rag.vectorstore import upsert_documents
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _text(chunk: str | Chunk) -> str:
+    return chunk.text if isinstance(chunk, Chunk) else chunk
+
+def _metadata(chunk: str | Chunk, source: str, extra: dict | None) -> dict:
+    metadata = {"source": source, **(extra or {})}
+    if isinstance(chunk, Chunk):
+        metadata.update(page=chunk.page, offset=chunk.offset)
+        if chunk.source is not None:
+            metadata["source"] = chunk.source
+    return metadata
+
+def _embed_batch(texts: list[str], known_embeddings: dict | None):
+    if not known_embeddings:
+        return embed_texts(texts, use_cache=True)
+
+    missing = [text for text in texts if text not in known_embeddings]
+    fresh = dict(zip(missing, embed_texts(missing, use_cache=True)))
+    return np.stack([
+        known_embeddings[text] if text in known_embeddings else fresh[text]
+        for text in texts
+    ]).astype(np.float32, copy=False)
 
-    ids = []
-    documents = []
-    embeddings = []
-    metadatas = []
-
-    for chunk in text_chunks:
-        ids.append(str(uuid.uuid4()))
-        documents.append(chunk)
-        embeddings.append(embed_text(chunk))  # ✅ VECTOR
-        metadatas.append({"source": source})
-
-    # ✅ THIS IS THE CRITICAL LINE
-    add_documents(
-        ids=ids,
-        documents=documents,
+def _write_batch(chunks: list[str | Chunk], embeddings, source: str, extra_metadata: dict | None, on_batch):
+    upsert_documents(
+        ids=[str(uuid.uuid4()) for _ in chunks],
+        documents=[_text(chunk) for chunk in chunks],
         embeddings=embeddings,
-        metadatas=metadatas
+        metadatas=[_metadata(chunk, source, extra_metadata) for chunk in chunks]
     )
+    CHUNKS_INGESTED.inc(len(chunks))
+    if on_batch is not None:
+        on_batch(len(chunks))
+
+def ingest_pdf(
+    text_chunks: Iterable[str | Chunk],
+    source: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    known_embeddings: dict | None = None,
+    extra_metadata: dict | None = None,
+    on_batch: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Takes extracted PDF text chunks and stores them in ChromaDB.
+    Chunk tuples from the loader also record their page number and offset,
+    and a Chunk's own source (if set) overrides `source`.
+
+    Chunks are pulled, embedded and upserted one batch at a time, and the
+    write of batch N overlaps the embedding of batch N+1. At most two
+    batches are alive at once, so memory stays flat for any document size
+    and earlier batches are searchable while later pages are still parsed.
+    Texts found in known_embeddings (text -> vector) reuse that vector
+    instead of being embedded again. extra_metadata is added to every
+    chunk's metadata, and on_batch(count) is called after each batch is
+    written.
+    Returns the number of chunks ingested.
+    """
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for chunks in _batched(text_chunks, max(1, batch_size)):
+            embeddings = _embed_batch([_text(chunk) for chunk in chunks], known_embeddings)  # ✅ one batched encode per window
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(_write_batch, chunks, embeddings, source, extra_metadata, on_batch)
+            total += len(chunks)
+
+        if pending is not None:
+            pending.result()
+
+    return total
@@ -0,0 +1,317 @@
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from app.config import INGEST_JOB_WORKERS, JOB_UPLOAD_DIR, JOBS_DB_PATH, UPLOAD_MEMORY_TOTAL_BYTES
+from app.ingestion.chunking import iter_chunks
+from app.ingestion.ingest import ingest_pdf
+from app.ingestion.page_store import record_pages
+from app.ingestion.pdf_loader import count_pages, iter_pdf_pages
+from app.rag.answer_cache import answer_cache
+from app.rag.vectorstore import delete_ids, iter_records
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_COLUMNS = (
+    "id", "source", "file_path", "state", "total_pages", "pages", "chunks",
+    "attempts", "error", "created_at", "started_at", "finished_at",
+    "sha256", "size_bytes",
+)
+
+# Added after the first release of the table
+_LATER_COLUMNS = {"sha256": "TEXT", "size_bytes": "INTEGER", "owner_pid": "INTEGER"}
+
+
+def _process_alive(pid: int | None) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class IngestJobQueue:
+    """
+    Upload ingestion jobs kept in SQLite and run by a fixed number of
+    worker threads. Uploads are parsed, chunked, embedded and written in
+    the background while /jobs/{id} reports progress. Every upload is
+    saved as a file in upload_dir before its job is queued and kept until
+    the job finishes. Small ones may also be handed over in memory, up to
+    memory_bytes in total (oldest dropped first), so a worker in the same
+    process can parse them without reading the file back. A failed job
+    has the chunks it wrote removed, so a document is either fully
+    searchable or not at all. On start-up, jobs left running by a process
+    that has since died are cleaned up the same way and queued again, so
+    an upload is neither lost nor duplicated by a restart. Several server
+    processes may share the queue: jobs are claimed atomically and record
+    the pid that runs them.
+    """
+
+    def __init__(self, path: str, upload_dir: str, workers: int, memory_bytes: int = 0):
+        self.path = path
+        self.upload_dir = Path(upload_dir)
+        self.workers = max(1, workers)
+        self.memory_bytes = max(0, memory_bytes)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._wake = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._payloads: OrderedDict[str, bytes] = OrderedDict()
+        self._payload_bytes = 0
+        self._payload_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " source TEXT NOT NULL,"
+                " file_path TEXT NOT NULL,"
+                " state TEXT NOT NULL,"
+                " total_pages INTEGER,"
+                " pages INTEGER NOT NULL DEFAULT 0,"
+                " chunks INTEGER NOT NULL DEFAULT 0,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in _LATER_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
+
+    def upload_path(self, job_id: str) -> Path:
+        return self.upload_dir / f"{job_id}.pdf"
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def _hold(self, job_id: str, payload: bytes):
+        with self._payload_lock:
+            if len(payload) > self.memory_bytes:
+                return
+            self._payloads[job_id] = payload
+            self._payload_bytes += len(payload)
+            # Any copy can go: the upload file is still there
+            while self._payload_bytes > self.memory_bytes:
+                _, dropped = self._payloads.popitem(last=False)
+                self._payload_bytes -= len(dropped)
+
+    def _take(self, job_id: str) -> bytes | None:
+        with self._payload_lock:
+            payload = self._payloads.pop(job_id, None)
+            if payload is not None:
+                self._payload_bytes -= len(payload)
+            return payload
+
+    def submit(
+        self,
+        job_id: str,
+        source: str,
+        payload: bytes | None = None,
+        sha256: str | None = None,
+        size_bytes: int | None = None,
+    ) -> str:
+        """
+        Queue a job for an upload already saved at upload_path(job_id).
+        payload, the same bytes, is an optional in-memory copy for this
+        process's workers.
+        """
+        if payload is not None:
+            self._hold(job_id, payload)
+        try:
+            self._execute(
+                "INSERT INTO jobs (id, source, file_path, state, created_at, sha256, size_bytes)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, source, str(self.upload_path(job_id)), QUEUED, time.time(), sha256, size_bytes),
+            )
+        except BaseException:
+            self._take(job_id)
+            raise
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(_COLUMNS, row))
+        del job["file_path"]
+        started, finished = job["started_at"], job["finished_at"]
+        elapsed = ((finished or time.time()) - started) if started else 0.0
+        job["elapsed_seconds"] = round(elapsed, 2)
+        job["pages_per_second"] = round(job["pages"] / elapsed, 2) if elapsed else 0.0
+        job["chunks_per_second"] = round(job["chunks"] / elapsed, 2) if elapsed else 0.0
+        return job
+
+    def _claim(self) -> dict | None:
+        # One statement, so two processes can never claim the same job
+        with self._lock:
+            conn = self._connection()
+            job = conn.execute(
+                "UPDATE jobs SET state = ?, owner_pid = ?, attempts = attempts + 1, pages = 0, chunks = 0,"
+                " error = NULL, started_at = ?, finished_at = NULL"
+                " WHERE state = ? AND id = (SELECT id FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1)"
+                " RETURNING id, source, file_path, attempts",
+                (RUNNING, os.getpid(), time.time(), QUEUED, QUEUED),
+            ).fetchone()
+            conn.commit()
+        if job is None:
+            return None
+        return dict(zip(("id", "source", "file_path", "attempts"), job))
+
+    def _recover(self):
+        """
+        Re-queue running jobs whose owning process is gone. An owner pid
+        recorded as this process's own predates it (the pid was reused),
+        since nothing has been claimed yet.
+        """
+        with self._lock:
+            running = self._connection().execute(
+                "SELECT id, owner_pid FROM jobs WHERE state = ?", (RUNNING,)
+            ).fetchall()
+        for job_id, owner_pid in running:
+            if owner_pid == os.getpid() or not _process_alive(owner_pid):
+                # Matching the old owner leaves the job alone if it was
+                # recovered and claimed again in the meantime
+                self._execute(
+                    "UPDATE jobs SET state = ? WHERE id = ? AND state = ? AND owner_pid IS ?",
+                    (QUEUED, job_id, RUNNING, owner_pid),
+                )
+
+    def _discard_partial(self, job_id: str):
+        # An interrupted earlier attempt may have written some batches
+        ids = [
+            chunk_id
+            for records in iter_records(include=(), where={"job_id": job_id})
+            for chunk_id in records["ids"]
+        ]
+        delete_ids(ids)
+
+    def _run(self, job: dict):
+        job_id = job["id"]
+        pdf = self._take(job_id)
+        if pdf is None:
+            pdf = job["file_path"]
+        if job["attempts"] > 1:
+            self._discard_partial(job_id)
+
+        total_pages = count_pages(pdf)
+        self._execute("UPDATE jobs SET total_pages = ? WHERE id = ?", (total_pages, job_id))
+
+        pages_seen = 0
+
+        def counted(pages):
+            # Page numbers, not yields: blank pages skipped by the loader
+            # still count as read
+            nonlocal pages_seen
+            for page in pages:
+                pages_seen = page.page
+                yield page
+
+        def on_batch(count: int):
+            # Written from the ingest writer thread, once per batch
+            self._execute(
+                "UPDATE jobs SET pages = ?, chunks = chunks + ? WHERE id = ?",
+                (pages_seen, count, job_id),
+            )
+
+        try:
+            # Keep the extracted page text so the source can be re-chunked later
+            pages = record_pages(counted(iter_pdf_pages(pdf)), job["source"])
+            ingest_pdf(
+                text_chunks=iter_chunks(pages),
+                source=job["source"],
+                extra_metadata={"job_id": job_id},
+                on_batch=on_batch,
+            )
+        finally:
+            # Even a failed job may have written some batches
+            answer_cache.invalidate()
+
+        # Blank pages are skipped by the loader, so report the full count
+        self._execute(
+            "UPDATE jobs SET state = ?, pages = ?, finished_at = ? WHERE id = ?",
+            (DONE, total_pages, time.time(), job_id),
+        )
+
+    def _worker(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                with self._wake:
+                    self._wake.wait(timeout=5)
+                continue
+
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"Ingest job {job['id']} failed")
+                traceback.print_exc()
+                try:
+                    self._discard_partial(job["id"])
+                    answer_cache.invalidate()
+                except Exception:
+                    # The job stays failed either way; any leftover chunks
+                    # carry its job_id in their metadata
+                    print(f"Could not remove partial chunks of ingest job {job['id']}")
+                    traceback.print_exc()
+                self._execute(
+                    "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (FAILED, str(e), time.time(), job["id"]),
+                )
+            finally:
+                if os.path.exists(job["file_path"]):
+                    os.remove(job["file_path"])
+
+    def start(self):
+        """
+        Re-queue jobs interrupted by a restart and start the workers
+        """
+        if self._threads:
+            return
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self._recover()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+
+ingest_jobs = IngestJobQueue(
+    path=JOBS_DB_PATH,
+    upload_dir=JOB_UPLOAD_DIR,
+    workers=INGEST_JOB_WORKERS,
+    memory_bytes=UPLOAD_MEMORY_TOTAL_BYTES,
+)
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from app.config import PAGE_STORE_DIR
+from app.ingestion.pdf_loader import PageText
+
+# One gzipped JSON-lines file per source: a header line with the source
+# name, then one {"page", "offset", "text"} line per extracted page.
+
+
+def _path(source: str) -> Path:
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    return Path(PAGE_STORE_DIR) / f"{digest}.jsonl.gz"
+
+
+def record_pages(pages: Iterable[PageText], source: str) -> Iterator[PageText]:
+    """
+    Pass pages through unchanged while saving them for `source`.
+    The stored copy is only replaced once the stream is fully consumed, so
+    a failed ingestion keeps the previous text.
+    """
+    path = _path(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{id(pages)}.tmp")
+
+    completed = False
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"source": source}) + "\n")
+            for page in pages:
+                f.write(json.dumps(page._asdict()) + "\n")
+                yield page
+        os.replace(tmp_path, path)
+        completed = True
+    finally:
+        if not completed and tmp_path.exists():
+            tmp_path.unlink()
+
+
+def has_pages(source: str) -> bool:
+    return _path(source).exists()
+
+
+def iter_stored_pages(source: str) -> Iterator[PageText]:
+    path = _path(source)
+    if not path.exists():
+        raise FileNotFoundError(f"No stored page text for source: {source}")
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        next(f)  # header
+        for line in f:
+            yield PageText(**json.loads(line))
+
+
+def list_sources() -> list[str]:
+    root = Path(PAGE_STORE_DIR)
+    if not root.exists():
+        return []
+
+    sources = []
+    for path in sorted(root.glob("*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            sources.append(json.loads(f.readline())["source"])
+    return sorted(sources)
+
+
+def delete_pages(source: str):
+    _path(source).unlink(missing_ok=True)
+
+
+def clear_pages():
+    shutil.rmtree(PAGE_STORE_DIR, ignore_errors=True)
@@ -1,27 +1,217 @@
-from pypdf import PdfReader
+import io
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import BinaryIO
 
-def load_and_split_pdf(file_path: str, chunk_size: int = 500, overlap: int = 50):
+from pypdf import PdfReader
+
+from app.config import PDF_EXTRACT_WORKERS, PDF_PAGES_PER_SHARD, PDF_PARALLEL_MIN_PAGES
+from app.ingestion.chunking import Chunk, PageText, iter_chunks
+from app.metrics import timed_iter
+
+# A PDF given as a path, raw bytes or a binary file object (e.g. an
+# upload's spooled buffer). Paths are opened by name; anything else is
+# read from memory, so no temporary file is needed.
+PdfSource = str | os.PathLike | bytes | bytearray | memoryview | BinaryIO
+
+def _open(pdf) -> PdfReader:
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return PdfReader(io.BytesIO(pdf))
+    return PdfReader(pdf)
+
+def _portable(pdf: PdfSource) -> str | bytes:
+    # What a worker process can open: the path, or the document bytes
+    if isinstance(pdf, (str, os.PathLike)):
+        return os.fspath(pdf)
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return bytes(pdf)
+    pdf.seek(0)
+    return pdf.read()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def process_context() -> multiprocessing.context.BaseContext:
     """
-    Load a PDF and split text into overlapping chunks
+    Start method for extraction worker pools: a forkserver (spawn where
+    there is none) rather than a fork of this multi-threaded process,
+    which could inherit held locks.
     """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _extract_pool() -> ProcessPoolExecutor:
+    """The process pool shared by every document, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, PDF_EXTRACT_WORKERS),
+                mp_context=process_context(),
+            )
+        return _pool
 
-    reader = PdfReader(file_path)
-    full_text = ""
+def shutdown_extract_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
 
-    for page in reader.pages:
-        text = page.extract_text()
+@contextmanager
+def _shared_document(pdf: PdfSource):
+    """
+    Describe the document so any pool worker can open it: (key, path) for
+    a file, or (key, shared memory name, size) for one held in memory. The
+    shared memory is released once the caller is done with it.
+    """
+    key = uuid.uuid4().hex
+    if isinstance(pdf, (str, os.PathLike)):
+        yield (key, os.fspath(pdf))
+        return
+
+    data = _portable(pdf)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    try:
+        shm.buf[:len(data)] = data
+        yield (key, shm.name, len(data))
+    finally:
+        shm.close()
+        shm.unlink()
+
+# Documents a worker keeps open at once: enough for a couple of jobs
+# extracting side by side without reopening on every switch
+_WORKER_CACHED_DOCUMENTS = 2
+_worker_documents: OrderedDict[str, PdfReader] = OrderedDict()
+
+def _worker_reader(document: tuple) -> PdfReader:
+    # Each worker opens a document once and reuses it for the rest of its
+    # shards, dropping the least recently used one past the limit
+    key = document[0]
+    reader = _worker_documents.get(key)
+    if reader is not None:
+        _worker_documents.move_to_end(key)
+        return reader
+
+    if len(document) == 2:
+        reader = _open(document[1])
+    else:
+        shm = shared_memory.SharedMemory(name=document[1])
+        try:
+            reader = _open(bytes(shm.buf[:document[2]]))
+        finally:
+            shm.close()
+    _worker_documents[key] = reader
+    while len(_worker_documents) > _WORKER_CACHED_DOCUMENTS:
+        _worker_documents.popitem(last=False)
+    return reader
+
+def _release_documents(keys: tuple[str, ...]):
+    for key in keys:
+        _worker_documents.pop(key, None)
+
+_finished = deque(maxlen=16)
+
+def _release(pool: ProcessPoolExecutor, key: str):
+    """
+    Ask the workers to drop a finished document. Tasks can't be aimed at a
+    particular worker, so one goes out per worker and each also names the
+    last few finished documents, in case an earlier release missed one.
+    """
+    with _pool_lock:
+        _finished.append(key)
+        keys = tuple(_finished)
+    for _ in range(max(1, PDF_EXTRACT_WORKERS)):
+        pool.submit(_release_documents, keys)
+
+def _extract_page_range(document: tuple, start: int, stop: int) -> list[str]:
+    reader = _worker_reader(document)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _iter_page_range_texts(pdf: PdfSource, page_count: int, workers: int) -> Iterator[str]:
+    """
+    Extract page ranges across the shared process pool and yield texts in
+    page order. At most workers * 2 shards are in flight, so results never
+    pile up ahead of a slow consumer.
+    """
+
+    shard = max(1, PDF_PAGES_PER_SHARD)
+    ranges = deque((start, min(start + shard, page_count)) for start in range(0, page_count, shard))
+    pool = _extract_pool()
+
+    with _shared_document(pdf) as document:
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < workers * 2:
+                    in_flight.append(pool.submit(_extract_page_range, document, *ranges.popleft()))
+                yield from in_flight.popleft().result()
+        finally:
+            # Abandoned early (consumer stopped or a shard failed)
+            for future in in_flight:
+                future.cancel()
+            _release(pool, document[0])
+
+def iter_pdf_pages(
+    pdf: PdfSource,
+    workers: int = PDF_EXTRACT_WORKERS,
+    parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+) -> Iterator[PageText]:
+    """
+    Yield the text of each non-empty page with its page number and offset.
+    Large PDFs are extracted in parallel; small ones stay single-process.
+    pdf may be a path, bytes or a binary file object.
+    """
+
+    reader = _open(pdf)
+    page_count = len(reader.pages)
+
+    if workers > 1 and page_count >= max(parallel_min_pages, 2):
+        texts = _iter_page_range_texts(pdf, page_count, workers)
+    else:
+        texts = (page.extract_text() or "" for page in reader.pages)
+
+    offset = 0
+    for index, text in enumerate(timed_iter("pdf_extract", texts)):
         if text:
-            full_text += text + "\n"
+            yield PageText(page=index + 1, offset=offset, text=text)
+            offset += len(text) + 1
 
-    # -------------------------
-    # Split into chunks
-    # -------------------------
-    chunks = []
-    start = 0
+def count_pages(pdf: PdfSource) -> int:
+    return len(_open(pdf).pages)
 
-    while start < len(full_text):
-        end = start + chunk_size
-        chunks.append(full_text[start:end])
-        start = end - overlap
+def iter_pdf_chunks(
+    pdf: PdfSource,
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+    strategy=None,
+    **extract_options,
+) -> Iterator[Chunk]:
+    """
+    Stream chunks straight from a PDF, page by page
+    """
+
+    return iter_chunks(
+        iter_pdf_pages(pdf, **extract_options),
+        chunk_size=chunk_size,
+        overlap=overlap,
+        strategy=strategy,
+    )
+
+def load_and_split_pdf(pdf: PdfSource, chunk_size: int | None = None, overlap: int | None = None, strategy=None):
+    """
+    Load a PDF and split text into chunks with the configured strategy
+    """
 
-    return chunks
+    return [
+        chunk.text
+        for chunk in iter_pdf_chunks(pdf, chunk_size=chunk_size, overlap=overlap, strategy=strategy)
+    ]
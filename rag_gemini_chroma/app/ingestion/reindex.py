@@ -0,0 +1,74 @@
+import argparse
+
+import numpy as np
+
+from app.ingestion.chunking import STRATEGIES
+from app.ingestion.ingest import ingest_pdf
+from app.ingestion.page_store import has_pages, iter_stored_pages, list_sources
+from app.ingestion.pdf_loader import iter_chunks
+from app.rag.vectorstore import delete_ids, iter_source_records
+
+def reindex_source(
+    source: str,
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+    strategy: str | None = None,
+) -> int:
+    """
+    Re-chunk a source from its stored page text and replace its vectors.
+
+    Existing chunks are read back first, so any chunk whose text is
+    unchanged under the new parameters reuses its stored vector instead of
+    being embedded again. chunk_size and overlap are in characters for
+    the fixed and recursive strategies and in tokens for sentence; None
+    falls back to the configured defaults. The old vectors are deleted only after the new
+    ones are written, so the source stays searchable throughout.
+    Returns the number of chunks ingested.
+    """
+
+    if not has_pages(source):
+        raise FileNotFoundError(f"No stored page text for source: {source}")
+
+    old_ids = []
+    known_embeddings = {}
+    for records in iter_source_records(source, include=("documents", "embeddings")):
+        old_ids.extend(records["ids"])
+        for text, vector in zip(records["documents"], records["embeddings"]):
+            if text is not None:
+                known_embeddings[text] = np.asarray(vector, dtype=np.float32)
+
+    chunks_ingested = ingest_pdf(
+        text_chunks=iter_chunks(
+            iter_stored_pages(source),
+            chunk_size=chunk_size,
+            overlap=overlap,
+            strategy=strategy,
+        ),
+        source=source,
+        known_embeddings=known_embeddings,
+    )
+    delete_ids(old_ids)
+    return chunks_ingested
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-chunk stored PDF text and replace its vectors")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--source", help="source name as uploaded (the PDF filename)")
+    target.add_argument("--all", action="store_true", help="re-index every stored source")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), help="chunking strategy (default CHUNK_STRATEGY)")
+    parser.add_argument("--chunk-size", type=int, help="characters, or tokens for the sentence strategy")
+    parser.add_argument("--overlap", type=int)
+    args = parser.parse_args()
+
+    sources = list_sources() if args.all else [args.source]
+    for source in sources:
+        count = reindex_source(
+            source,
+            chunk_size=args.chunk_size,
+            overlap=args.overlap,
+            strategy=args.strategy,
+        )
+        print(f"{source}: {count} chunks")
+
+if __name__ == "__main__":
+    main()
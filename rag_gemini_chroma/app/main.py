@@ -1,48 +1,146 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import hashlib
+import io
 import os
-import shutil
 import traceback
+from contextlib import aclosing, asynccontextmanager
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
-from app.config import COLLECTION_NAME
-from app.ingestion.ingest import ingest_pdf
-from app.ingestion.pdf_loader import load_and_split_pdf
-from app.rag.chroma_client import get_chroma_client
-from app.rag.pipeline import rag_pipeline
-from app.rag.vectorstore import get_collection
+from app.concurrency import run_blocking
+from app.config import (
+    CHUNK_STRATEGY,
+    COLLECTION_NAME,
+    MAX_UPLOAD_BYTES,
+    QUERY_BATCH_MAX_SIZE,
+    UPLOAD_IN_MEMORY_MAX_BYTES,
+    WARMUP_ON_STARTUP,
+)
+from app.ingestion.jobs import ingest_jobs
+from app.ingestion.page_store import clear_pages
+from app.ingestion.pdf_loader import shutdown_extract_pool
+from app.ingestion.reindex import reindex_source
+from app.metrics import REQUEST_ERRORS, RequestMetrics, render
+from app.rag.answer_cache import answer_cache
+from app.rag.context_builder import context_stats
+from app.rag.embed_scheduler import embed_scheduler
+from app.rag.generator import gemini_client
+from app.rag.pipeline import rag_pipeline_async, rag_pipeline_batch, rag_pipeline_stream
+from app.rag.collection_stats import collection_stats
+from app.rag.vectorstore import (
+    clear_collection,
+    ensure_stats,
+    get_collection_stats,
+    get_page,
+    reset_collection,
+)
+from app.warmup import record_import_time, run_warmup, warmup_state
 
-app = FastAPI()
+record_import_time(time.perf_counter() - _IMPORT_STARTED)
 
+_warmup_task = None
 
-@app.post("/upload")
-async def upload_pdf(file: UploadFile = File(...)):
-    file_path = f"temp_{file.filename}"
+
+def _start_warmup():
+    # Opens the Chroma handle and loads the models off the event loop;
+    # a failed stage (e.g. Chroma not up yet) is retried by /ready
+    global _warmup_task
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.create_task(
+            run_blocking("admin", run_warmup, _IMPORT_STARTED)
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Also resumes jobs interrupted by the last shutdown
+    ingest_jobs.start()
+    if WARMUP_ON_STARTUP:
+        _start_warmup()
+    yield
+    reset_collection(reconnect=True)
+    shutdown_extract_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMetrics)
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _queue_upload(upload, source: str) -> dict:
+    """
+    Save the upload to its per-job file, hashing it on the way, before
+    the job is queued, so an accepted upload survives a restart. Up to
+    UPLOAD_IN_MEMORY_MAX_BYTES a copy is also kept in memory and handed
+    to the job queue, sparing the worker a read of the file.
+    """
+    job_id = ingest_jobs.new_job_id()
+    file_path = ingest_jobs.upload_path(job_id)
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    size = 0
     try:
         with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+            while block := upload.read(1024 * 1024):
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+                digest.update(block)
+                f.write(block)
+                if buffer is not None and size > UPLOAD_IN_MEMORY_MAX_BYTES:
+                    buffer = None
+                if buffer is not None:
+                    buffer.write(block)
+            f.flush()
+            os.fsync(f.fileno())
 
-        text_chunks = load_and_split_pdf(file_path)
-        ingest_pdf(text_chunks=text_chunks, source=file.filename)
+        payload = buffer.getvalue() if buffer is not None else None
+        ingest_jobs.submit(job_id, source, payload=payload, sha256=digest.hexdigest(), size_bytes=size)
+        return {"job_id": job_id, "sha256": digest.hexdigest(), "size_bytes": size}
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
 
-        return {
-            "status": "PDF ingested successfully",
-            "source": file.filename,
-            "chunks_ingested": len(text_chunks),
-        }
 
+@app.post("/upload", status_code=202)
+async def upload_pdf(file: UploadFile = File(...)):
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    try:
+        queued = await run_blocking("ingest", _queue_upload, file.file, file.filename)
+        return {"status": "queued", "source": file.filename, **queued}
+
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print("PDF upload error")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_blocking("admin", ingest_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
 
 
 @app.post("/query")
 async def query_rag(question: str):
     try:
-        answer = rag_pipeline(question)
+        answer = await rag_pipeline_async(question)
         return {"answer": answer}
     except Exception as e:
         print("Query error")
@@ -50,56 +148,109 @@ async def query_rag(question: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/chroma/summary")
-async def chroma_summary(limit: int = 20):
+class BatchQueryRequest(BaseModel):
+    questions: list[str]
+    chat_history: str = ""
+
+
+@app.post("/query/batch")
+async def query_rag_batch(request: BatchQueryRequest):
+    if len(request.questions) > QUERY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {QUERY_BATCH_MAX_SIZE} questions per batch",
+        )
+
+    results = await rag_pipeline_batch(request.questions, request.chat_history)
+    return {
+        "results": results,
+        "errors": sum(1 for result in results if "error" in result),
+    }
+
+
+async def _forward_stream(stream):
+    # Headers are already sent once streaming starts, so a failure can only
+    # be logged and the response cut short
     try:
-        safe_limit = max(1, min(limit, 200))
+        async with aclosing(stream):
+            async for text in stream:
+                yield text
+    except Exception:
+        print("Query stream error")
+        traceback.print_exc()
+        # Already counted as a 2xx by the middleware
+        REQUEST_ERRORS.labels("/query/stream").inc()
 
-        collection = get_collection()
-        count = collection.count()
-        records = collection.get(include=["documents", "metadatas"])
 
-        ids = records.get("ids", [])
-        documents = records.get("documents", [])
-        metadatas = records.get("metadatas", [])
+@app.post("/query/stream")
+async def query_rag_stream(question: str):
+    try:
+        stream = await rag_pipeline_stream(question)
+    except Exception as e:
+        print("Query error")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        _forward_stream(stream),
+        media_type="text/plain; charset=utf-8",
+    )
+
+
+def _chroma_summary(limit: int, offset: int) -> dict:
+    safe_limit = max(1, min(limit, 200))
+    safe_offset = max(0, offset)
+
+    # Counts come from the incrementally maintained stats and the preview
+    # from one offset/limit page. This is offset paging, not a cursor:
+    # Chroma can't seek by id, so a page costs O(offset). Fine for
+    # browsing the first pages; walk a whole collection with iter_records
+    ensure_stats()
+    stats = collection_stats.summary()
+    count = get_collection_stats()["count"]
+    records = get_page(offset=safe_offset, limit=safe_limit)
 
-        sources = sorted(
+    ids = records.get("ids", [])
+    documents = records.get("documents", [])
+    metadatas = records.get("metadatas", [])
+
+    preview_rows = []
+    for idx, doc in enumerate(documents):
+        text = doc or ""
+
+        source = "unknown"
+        if idx < len(metadatas) and isinstance(metadatas[idx], dict):
+            source = metadatas[idx].get("source", "unknown")
+
+        preview_rows.append(
             {
-                md.get("source", "unknown")
-                for md in metadatas
-                if isinstance(md, dict)
+                "id": ids[idx] if idx < len(ids) else f"row-{idx}",
+                "source": source,
+                "chars": len(text),
+                "preview": text[:240],
             }
         )
 
-        preview_rows = []
-        total_chars = 0
-        for idx, doc in enumerate(documents):
-            text = doc or ""
-            total_chars += len(text)
-
-            source = "unknown"
-            if idx < len(metadatas) and isinstance(metadatas[idx], dict):
-                source = metadatas[idx].get("source", "unknown")
-
-            preview_rows.append(
-                {
-                    "id": ids[idx] if idx < len(ids) else f"row-{idx}",
-                    "source": source,
-                    "chars": len(text),
-                    "preview": text[:240],
-                }
-            )
+    chunk_count = stats["chunk_count"]
+    avg_chunk_chars = (stats["total_chars"] / chunk_count) if chunk_count else 0.0
+    next_offset = safe_offset + len(ids)
 
-        avg_chunk_chars = (total_chars / len(documents)) if documents else 0.0
+    return {
+        "collection_name": COLLECTION_NAME,
+        "vector_count": count,
+        "source_count": len(stats["sources"]),
+        "sources": stats["sources"],
+        "avg_chunk_chars": round(avg_chunk_chars, 2),
+        "preview_rows": preview_rows,
+        "offset": safe_offset,
+        "next_offset": next_offset if next_offset < count else None,
+    }
 
-        return {
-            "collection_name": COLLECTION_NAME,
-            "vector_count": count,
-            "source_count": len(sources),
-            "sources": sources,
-            "avg_chunk_chars": round(avg_chunk_chars, 2),
-            "preview_rows": preview_rows[:safe_limit],
-        }
+
+@app.get("/chroma/summary")
+async def chroma_summary(limit: int = 20, offset: int = 0):
+    try:
+        return await run_blocking("admin", _chroma_summary, limit, offset)
     except Exception as e:
         print("Chroma summary error")
         traceback.print_exc()
@@ -109,11 +260,83 @@ async def chroma_summary(limit: int = 20):
 @app.delete("/chroma/clear")
 async def clear_chroma():
     try:
-        client = get_chroma_client()
-        client.delete_collection(COLLECTION_NAME)
-        client.get_or_create_collection(COLLECTION_NAME)
+        await run_blocking("admin", clear_collection)
+        await run_blocking("admin", clear_pages)
+        answer_cache.invalidate()
         return {"status": "cleared", "collection_name": COLLECTION_NAME}
     except Exception as e:
         print("Chroma clear error")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/reindex")
+async def reindex(
+    source: str,
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+    strategy: str | None = None,
+):
+    try:
+        try:
+            chunks_ingested = await run_blocking(
+                "ingest", reindex_source, source, chunk_size, overlap, strategy
+            )
+        finally:
+            answer_cache.invalidate()
+
+        return {
+            "status": "reindexed",
+            "source": source,
+            "strategy": strategy or CHUNK_STRATEGY,
+            "chunk_size": chunk_size,
+            "overlap": overlap,
+            "chunks_ingested": chunks_ingested,
+        }
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print("Reindex error")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return answer_cache.stats()
+
+
+@app.get("/context/stats")
+async def context_builder_stats():
+    return context_stats()
+
+
+@app.get("/embed/scheduler/stats")
+async def embed_scheduler_stats():
+    return embed_scheduler.stats()
+
+
+@app.get("/generator/stats")
+async def generator_stats():
+    return gemini_client.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/ready")
+async def ready():
+    state = warmup_state()
+    if not WARMUP_ON_STARTUP:
+        # Models load lazily on first use instead
+        return {"ready": True, "warmup": "disabled", **state}
+    if state["ready"]:
+        return state
+    if state["error"] and not state["running"]:
+        _start_warmup()
+    return JSONResponse(status_code=503, content=state)
@@ -0,0 +1,140 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Label values are fixed sets (stage names, route templates, status
+# classes), never user input, so series counts stay small and bounded
+
+STAGES = (
+    "pdf_extract",
+    "chunking",
+    "embed",
+    "chroma_add",
+    "chroma_query",
+    "lexical_search",
+    "rerank",
+    "generate",
+)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each pipeline stage (per call; per document for pdf_extract and chunking)",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Estimated prompt size sent to the generator, in tokens",
+    buckets=(64, 128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192),
+)
+
+REQUESTS = Counter(
+    "rag_http_requests_total",
+    "HTTP requests by route and status class",
+    ["route", "status"],
+)
+
+REQUEST_ERRORS = Counter(
+    "rag_http_request_errors_total",
+    "HTTP requests that failed with a server error",
+    ["route"],
+)
+
+REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "Time to response headers by route (streamed bodies continue after this)",
+    ["route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+CHUNKS_INGESTED = Counter(
+    "rag_chunks_ingested_total",
+    "Chunks embedded and written to the vector store",
+)
+
+VECTOR_COUNT = Gauge(
+    "rag_vector_count",
+    "Chunks in the collection, from the incrementally maintained stats",
+)
+
+# Children bound once, so the hot path skips the label lookup
+_stage_children = {name: STAGE_SECONDS.labels(name) for name in STAGES}
+
+
+def stage_timer(name: str):
+    """
+    Histogram child for a stage; use as `with stage_timer("embed").time():`
+    or call .observe(seconds) for time accumulated across a document.
+    """
+    return _stage_children[name]
+
+
+def timed_iter(name: str, iterator):
+    """
+    Yield from iterator, observing only the time spent producing items
+    (not the time the consumer holds each one) once it is exhausted.
+    """
+    elapsed = 0.0
+    iterator = iter(iterator)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - start
+        yield item
+    _stage_children[name].observe(elapsed)
+
+
+def record_request(route: str, status_code: int, seconds: float):
+    REQUESTS.labels(route, f"{status_code // 100}xx").inc()
+    REQUEST_SECONDS.labels(route).observe(seconds)
+    if status_code >= 500:
+        REQUEST_ERRORS.labels(route).inc()
+
+
+class RequestMetrics:
+    """
+    ASGI middleware recording each HTTP request when its response starts,
+    without wrapping the response body the way @app.middleware does.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status_code: int):
+            nonlocal recorded
+            recorded = True
+            # Label by route template, so unknown paths can't add series
+            route = scope.get("route")
+            record_request(
+                route.path if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - started,
+            )
+
+        async def send_counted(message):
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            if not recorded:
+                record(500)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,140 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from app.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+
+
+class _Entry(NamedTuple):
+    key: tuple                # (frozenset of retrieved chunk ids, chat history)
+    embedding: np.ndarray     # unit-normalized question embedding
+    answer: str
+    latency: float            # seconds the original generation took
+    expires_at: float
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Answers keyed on the question embedding. A lookup hits when a cached
+    question is at least `threshold` cosine-similar and the retrieved
+    chunk-id set (and chat history) matches exactly, so the answer was
+    generated from the same context.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()  # LRU order
+        self._by_key: dict[tuple, set[int]] = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def generation(self) -> int:
+        """
+        Bumped on every invalidate(); pass it back to store() so answers
+        computed against an older collection are dropped.
+        """
+        return self._generation
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket = self._by_key[entry.key]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._by_key[entry.key]
+
+    def lookup(self, embedding, chunk_ids, chat_history: str = "") -> str | None:
+        if not self.enabled:
+            return None
+
+        key = (frozenset(chunk_ids), chat_history)
+        query = _normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_key.get(key, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(entry.embedding, query))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            self.hits += 1
+            self.saved_seconds += entry.latency
+            return entry.answer
+
+    def store(self, embedding, chunk_ids, chat_history: str, answer: str, latency: float, generation: int):
+        if not self.enabled or self.max_entries <= 0:
+            return
+
+        key = (frozenset(chunk_ids), chat_history)
+        entry = _Entry(key, _normalize(embedding), answer, latency, time.monotonic() + self.ttl_seconds)
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._by_key.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_key.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    threshold=ANSWER_CACHE_SIMILARITY,
+    enabled=ANSWER_CACHE_ENABLED,
+)
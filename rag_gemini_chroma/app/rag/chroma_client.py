@@ -1,11 +1,45 @@
+import threading
+
 import chromadb
+import httpx
+from chromadb.errors import NotFoundError
 from app.config import CHROMA_DB_DIR, CHROMA_HOST, CHROMA_PORT, USE_CHROMA_HTTP
 
+# The request never reached the server, or the cached collection handle
+# is stale (collection recreated by another process): any operation can
+# be retried after reconnecting
+RECONNECT_ERRORS = (ConnectionError, httpx.ConnectError, NotFoundError)
+# The connection dropped mid-request, so the server may have applied it:
+# only reads are safe to repeat
+DROPPED_ERRORS = (httpx.RemoteProtocolError, httpx.ReadError)
 
-def get_chroma_client():
-    """
-    Connect to ChromaDB in either persistent local mode or HTTP server mode.
-    """
+_client = None
+_lock = threading.Lock()
+
+
+def _connect():
     if USE_CHROMA_HTTP:
         return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
     return chromadb.PersistentClient(path=CHROMA_DB_DIR)
+
+
+def get_chroma_client():
+    """
+    Return the process-wide ChromaDB client, connecting on first use in
+    either persistent local mode or HTTP server mode.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _connect()
+    return _client
+
+
+def reset_chroma_client():
+    """
+    Drop the cached client so the next get_chroma_client() reconnects.
+    """
+    global _client
+    with _lock:
+        _client = None
@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+from app.config import COLLECTION_NAME, STATS_DB_PATH
+from app.metrics import VECTOR_COUNT
+
+
+def _totals(metadatas, documents) -> tuple[Counter, Counter]:
+    chunks, chars = Counter(), Counter()
+    for metadata, document in zip(metadatas, documents):
+        source = (metadata or {}).get("source", "unknown")
+        chunks[source] += 1
+        chars[source] += len(document or "")
+    return chunks, chars
+
+
+class CollectionStats:
+    """
+    Per-source chunk counts and character totals, kept in SQLite and
+    updated as batches are written or deleted, so summaries never have to
+    scan the collection. Every change also sets the rag_vector_count
+    gauge, so scrapes never touch the database.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = path
+        self.collection_name = collection_name
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS source_stats ("
+                " collection TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " chunks INTEGER NOT NULL,"
+                " chars INTEGER NOT NULL,"
+                " PRIMARY KEY (collection, source))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS initialized (collection TEXT PRIMARY KEY)"
+            )
+            self._conn = conn
+            self._publish()
+        return self._conn
+
+    def _publish(self):
+        # Callers hold self._lock
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(chunks), 0) FROM source_stats WHERE collection = ?",
+            (self.collection_name,),
+        ).fetchone()
+        VECTOR_COUNT.set(row[0])
+
+    def _apply(self, metadatas, documents, sign: int):
+        chunks, chars = _totals(metadatas, documents)
+        rows = [
+            (self.collection_name, source, sign * chunks[source], sign * chars[source])
+            for source in chunks
+        ]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT INTO source_stats (collection, source, chunks, chars) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (collection, source) DO UPDATE SET"
+                " chunks = chunks + excluded.chunks, chars = chars + excluded.chars",
+                rows,
+            )
+            conn.execute(
+                "DELETE FROM source_stats WHERE collection = ? AND chunks <= 0",
+                (self.collection_name,),
+            )
+            conn.commit()
+            self._publish()
+
+    def add(self, metadatas, documents):
+        self._apply(metadatas, documents, 1)
+
+    def subtract(self, metadatas, documents):
+        self._apply(metadatas, documents, -1)
+
+    def reset(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM source_stats WHERE collection = ?", (self.collection_name,))
+            conn.execute("INSERT OR IGNORE INTO initialized VALUES (?)", (self.collection_name,))
+            conn.commit()
+            self._publish()
+
+    def is_initialized(self) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM initialized WHERE collection = ?", (self.collection_name,)
+            ).fetchone()
+        return row is not None
+
+    def rebuild(self, record_pages, if_missing: bool = False):
+        """
+        Recompute from scratch; record_pages yields get() results with
+        documents and metadatas. Used once for collections that predate
+        these stats. The totals replace the old ones, and the collection
+        is marked initialized, only once the whole scan has succeeded.
+        Rebuilds are serialized; with if_missing, one that finds the stats
+        already built (e.g. by a concurrent caller) does nothing.
+        """
+        with self._rebuild_lock:
+            if if_missing and self.is_initialized():
+                return
+
+            chunks, chars = Counter(), Counter()
+            for records in record_pages:
+                page_chunks, page_chars = _totals(records["metadatas"], records["documents"])
+                chunks.update(page_chunks)
+                chars.update(page_chars)
+
+            with self._lock:
+                conn = self._connection()
+                try:
+                    conn.execute("DELETE FROM source_stats WHERE collection = ?", (self.collection_name,))
+                    conn.executemany(
+                        "INSERT INTO source_stats (collection, source, chunks, chars) VALUES (?, ?, ?, ?)",
+                        [(self.collection_name, source, chunks[source], chars[source]) for source in chunks],
+                    )
+                    conn.execute("INSERT OR IGNORE INTO initialized VALUES (?)", (self.collection_name,))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                self._publish()
+
+    def chunk_count(self) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(chunks), 0) FROM source_stats WHERE collection = ?",
+                (self.collection_name,),
+            ).fetchone()
+        return row[0]
+
+    def summary(self) -> dict:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT source, chunks, chars FROM source_stats WHERE collection = ? ORDER BY source",
+                (self.collection_name,),
+            ).fetchall()
+
+        chunk_count = sum(row[1] for row in rows)
+        total_chars = sum(row[2] for row in rows)
+        return {
+            "sources": [row[0] for row in rows],
+            "per_source": {row[0]: {"chunks": row[1], "chars": row[2]} for row in rows},
+            "chunk_count": chunk_count,
+            "total_chars": total_chars,
+        }
+
+
+collection_stats = CollectionStats(path=STATS_DB_PATH, collection_name=COLLECTION_NAME)
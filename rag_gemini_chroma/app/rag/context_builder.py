@@ -0,0 +1,149 @@
+import math
+import threading
+from typing import NamedTuple
+
+from app.config import CONTEXT_CHARS_PER_TOKEN, CONTEXT_TOKEN_BUDGET
+
+# Below this many tokens of remaining budget a partial segment isn't worth adding
+_MIN_PARTIAL_TOKENS = 32
+_SEPARATOR = "\n\n"
+
+
+class BuiltContext(NamedTuple):
+    text: str
+    tokens: int          # estimated tokens in text
+    tokens_before: int   # estimated tokens of the naive join of all retrieved chunks
+    tokens_saved: int
+    segments: int
+
+
+class _Segment:
+    __slots__ = ("source", "start", "end", "text", "rank")
+
+    def __init__(self, source, start, text, rank):
+        self.source = source
+        self.start = start
+        self.end = None if start is None else start + len(text)
+        self.text = text
+        self.rank = rank
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+def _overlap_matches(current: _Segment, segment: _Segment) -> bool:
+    # The span both chunks claim must hold the same text in both
+    shared = min(current.end, segment.end) - segment.start
+    start = segment.start - current.start
+    return current.text[start:start + shared] == segment.text[:shared]
+
+
+def _merge(documents, metadatas) -> list[_Segment]:
+    """
+    Merge chunks that overlap or touch within the same ingest of a source
+    into one segment, dropping the repeated span. Overlapping chunks whose
+    shared span differs are kept apart. Chunks without a position are kept
+    as-is (exact duplicates dropped).
+    """
+    positioned: dict[tuple, list[_Segment]] = {}
+    standalone: list[_Segment] = []
+    seen_text = set()
+
+    for rank, (document, metadata) in enumerate(zip(documents, metadatas)):
+        document = document or ""
+        metadata = metadata or {}
+        offset = metadata.get("offset")
+        source = metadata.get("source", "unknown")
+        if isinstance(offset, int):
+            # Offsets only line up within one ingest: chunks left over from
+            # an earlier upload under the same name may hold other text
+            key = (source, metadata.get("job_id"))
+            positioned.setdefault(key, []).append(_Segment(source, offset, document, rank))
+        elif document not in seen_text:
+            seen_text.add(document)
+            standalone.append(_Segment(source, None, document, rank))
+
+    merged = list(standalone)
+    for segments in positioned.values():
+        segments.sort(key=lambda segment: segment.start)
+        current = segments[0]
+        for segment in segments[1:]:
+            if segment.start <= current.end and _overlap_matches(current, segment):
+                if segment.end > current.end:
+                    current.text += segment.text[current.end - segment.start:]
+                    current.end = segment.end
+                current.rank = min(current.rank, segment.rank)
+            else:
+                merged.append(current)
+                current = segment
+        merged.append(current)
+    return merged
+
+
+def _display_order(segments: list[_Segment]) -> list[_Segment]:
+    # Sources in order of their best-ranked chunk; document order within a source
+    source_rank: dict[str, int] = {}
+    for segment in segments:
+        source_rank[segment.source] = min(source_rank.get(segment.source, segment.rank), segment.rank)
+    return sorted(
+        segments,
+        key=lambda s: (source_rank[s.source], s.source, s.start if s.start is not None else -1, s.rank),
+    )
+
+
+def build_context(documents: list[str], metadatas: list[dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> BuiltContext:
+    """
+    Assemble retrieved chunks into prompt context: merge overlapping or
+    adjacent chunks of the same ingest, order them by position, and keep
+    the best-ranked segments that fit token_budget (truncating the last
+    one if a useful amount of budget is left).
+    """
+    tokens_before = estimate_tokens(_SEPARATOR.join(doc or "" for doc in documents))
+
+    selected = []
+    remaining = token_budget
+    for segment in sorted(_merge(documents, metadatas), key=lambda s: s.rank):
+        cost = estimate_tokens(segment.text) + (estimate_tokens(_SEPARATOR) if selected else 0)
+        if cost <= remaining:
+            selected.append(segment)
+            remaining -= cost
+        elif remaining >= _MIN_PARTIAL_TOKENS:
+            segment.text = segment.text[:int((remaining - 1) * CONTEXT_CHARS_PER_TOKEN)]
+            selected.append(segment)
+            remaining = 0
+        if remaining <= 0:
+            break
+
+    text = _SEPARATOR.join(segment.text for segment in _display_order(selected))
+    tokens = estimate_tokens(text)
+    _record(tokens_before, tokens)
+    return BuiltContext(
+        text=text,
+        tokens=tokens,
+        tokens_before=tokens_before,
+        tokens_saved=max(0, tokens_before - tokens),
+        segments=len(selected),
+    )
+
+
+_stats_lock = threading.Lock()
+_stats = {"builds": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def _record(tokens_before: int, tokens_after: int):
+    with _stats_lock:
+        _stats["builds"] += 1
+        _stats["tokens_before"] += tokens_before
+        _stats["tokens_after"] += tokens_after
+
+
+def context_stats() -> dict:
+    with _stats_lock:
+        saved = _stats["tokens_before"] - _stats["tokens_after"]
+        return {
+            **_stats,
+            "token_budget": CONTEXT_TOKEN_BUDGET,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / _stats["tokens_before"], 4) if _stats["tokens_before"] else 0.0,
+        }
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from app.config import (
+    EMBED_SCHEDULER_ENABLED,
+    EMBED_SCHEDULER_MAX_BATCH,
+)
+from app.rag.embeddings import embed_texts
+
+
+class EmbedScheduler:
+    """
+    Collects embed requests from concurrent callers and runs them as one
+    batched encode. When no batch is being encoded, whatever is pending
+    is sent at once, so a lone request pays no added wait. While one is
+    being encoded, the next batch fills until the encoder frees up or it
+    reaches max_batch texts; a request never waits longer than the encode
+    ahead of it, and a busy encoder never gets a queue of small batches.
+    Each caller blocks on its own Future and gets back its own vector.
+    """
+
+    def __init__(self, max_batch: int, enabled: bool = True):
+        self.max_batch = max(1, max_batch)
+        self.enabled = enabled
+
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0  # batches handed to the encoder and not yet done
+        self._encoder = None
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    # One encode at a time; the model already uses every core
+                    self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-encoder")
+                    self._worker = threading.Thread(target=self._run, name="embed-scheduler", daemon=True)
+                    self._worker.start()
+
+    def embed(self, text: str) -> np.ndarray:
+        if not self.enabled:
+            return embed_texts([text])[0]
+
+        self._ensure_worker()
+        future = Future()
+        with self._cond:
+            self._pending.append((text, time.perf_counter(), future))
+            self._cond.notify_all()
+        return future.result()
+
+    def _collect(self) -> list:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Woken by new requests and by the encoder finishing a batch
+            while self._in_flight and len(self._pending) < self.max_batch:
+                self._cond.wait()
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            self._in_flight += 1
+            return batch
+
+    def _run(self):
+        while True:
+            self._encoder.submit(self._encode, self._collect())
+
+    def _encode(self, batch: list):
+        started = time.perf_counter()
+        try:
+            vectors = embed_texts([text for text, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+        for (_, enqueued_at, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+        waits = [started - enqueued_at for _, enqueued_at, _ in batch]
+        with self._stats_lock:
+            self._batch_sizes[len(batch)] += 1
+            self._requests += len(batch)
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, *waits)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "enabled": self.enabled,
+                "max_batch": self.max_batch,
+                "queue_depth": len(self._pending),
+                "requests": self._requests,
+                "batches": batches,
+                "avg_batch_size": round(self._requests / batches, 2) if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_added_wait_ms": round(self._wait_total / self._requests * 1000, 3) if self._requests else 0.0,
+                "max_added_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+embed_scheduler = EmbedScheduler(
+    max_batch=EMBED_SCHEDULER_MAX_BATCH,
+    enabled=EMBED_SCHEDULER_ENABLED,
+)
@@ -0,0 +1,169 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.config import (
+    EMBED_CACHE_ENABLED,
+    EMBED_CACHE_MAX_ENTRIES,
+    EMBED_CACHE_PATH,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    ONNX_QUANTIZED,
+)
+
+# SQLite caps bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def _model_id() -> str:
+    # Backends produce slightly different vectors, so they don't share entries
+    if EMBEDDING_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL_NAME}/onnx{'-int8' if ONNX_QUANTIZED else ''}"
+    return EMBEDDING_MODEL_NAME
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by sha256(model name + normalized chunk
+    text). Vectors are stored as raw float32 blobs and evicted least
+    recently used once the table passes max_entries. The row count is
+    kept by triggers in the same database, so it stays exact when several
+    processes (server workers, the bulk ingest CLI) share the file.
+    """
+
+    def __init__(self, path: str, model_name: str, max_entries: int, enabled: bool = True):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module never touches disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+            # Seeded and hooked up in one write transaction, so no insert
+            # from another process falls between the count and the triggers
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entry_count ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " entries INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO entry_count SELECT 0, COUNT(*) FROM embeddings")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS embeddings_counted_insert AFTER INSERT ON embeddings"
+                " BEGIN UPDATE entry_count SET entries = entries + 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS embeddings_counted_delete AFTER DELETE ON embeddings"
+                " BEGIN UPDATE entry_count SET entries = entries - 1; END"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _entries(conn) -> int:
+        return conn.execute("SELECT entries FROM entry_count").fetchone()[0]
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Bulk lookup; returns a vector or None per text, in input order
+        """
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+
+        keys = [self.key(text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _LOOKUP_BATCH):
+                batch = unique_keys[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                conn.commit()
+
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: list[str], vectors: np.ndarray):
+        if not self.enabled or not texts:
+            return
+
+        now = time.time()
+        rows = {
+            self.key(text): np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+            for text, vector in zip(texts, vectors)
+        }
+
+        with self._lock:
+            conn = self._connection()
+            # Keys are content hashes, so an existing row already holds this vector
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, blob, now) for key, blob in rows.items()],
+            )
+            # The insert holds the write lock, so the count includes every
+            # other process's committed rows
+            overflow = self._entries(conn) - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._entries(self._connection()) if self.enabled else 0
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "model_name": self.model_name,
+            }
+
+
+embedding_cache = EmbeddingCache(
+    path=EMBED_CACHE_PATH,
+    model_name=_model_id(),
+    max_entries=EMBED_CACHE_MAX_ENTRIES,
+    enabled=EMBED_CACHE_ENABLED,
+)
@@ -1,10 +1,84 @@
-from sentence_transformers import SentenceTransformer
+import threading
 
-# Free, fast, excellent for RAG
-_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
+
+from app.config import EMBED_BATCH_SIZE, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+from app.metrics import stage_timer
+from app.rag.embedding_cache import embedding_cache
+
+# Free, fast, excellent for RAG. Loaded on first use (or by warm-up) so
+# importing this module stays cheap. EMBEDDING_BACKEND picks PyTorch or
+# the exported ONNX model; both expose the same encode() API.
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if EMBEDDING_BACKEND == "onnx":
+                    from app.rag.onnx_embedder import load_embedder
+
+                    _model = load_embedder()
+                else:
+                    from sentence_transformers import SentenceTransformer
+
+                    _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+def embedding_dimension() -> int:
+    return get_model().get_sentence_embedding_dimension()
+
+def warm_up():
+    """
+    Load the model and run one encode so the first request doesn't pay for it
+    """
+    embed_texts(["warm-up"])
+
+def _encode(texts: list[str], batch_size: int) -> np.ndarray:
+    if not texts:
+        return np.empty((0, embedding_dimension()), dtype=np.float32)
+
+    with stage_timer("embed").time():
+        vectors = get_model().encode(
+            texts,
+            batch_size=max(1, batch_size),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+def embed_texts(texts: list[str], batch_size: int = EMBED_BATCH_SIZE, use_cache: bool = False) -> np.ndarray:
+    """
+    Generate embeddings for many texts in batched forward passes.
+    Returns a contiguous float32 array of shape (len(texts), dim).
+
+    With use_cache, the persistent embedding cache is checked in bulk
+    first and only the misses are sent to the model; when every text is
+    a hit, the model is never loaded.
+    """
+    if not use_cache or not embedding_cache.enabled or not texts:
+        return _encode(texts, batch_size)
+
+    cached = embedding_cache.get_many(texts)
+    misses = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    fresh = {}
+    if misses:
+        encoded = _encode(misses, batch_size)
+        embedding_cache.put_many(misses, encoded)
+        fresh = dict(zip(misses, encoded))
+        dimension = encoded.shape[1]
+    else:
+        dimension = len(cached[0])
+
+    vectors = np.empty((len(texts), dimension), dtype=np.float32)
+    for row, (text, vector) in enumerate(zip(texts, cached)):
+        vectors[row] = vector if vector is not None else fresh[text]
+    return vectors
 
 def embed_text(text: str) -> list:
     """
     Generate vector embedding for text (FREE, local).
     """
-    return _model.encode(text).tolist()
+    return embed_texts([text])[0].tolist()
@@ -0,0 +1,88 @@
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeServiceUnavailable(Exception):
+    """
+    Stands in for google.api_core.exceptions.ServiceUnavailable
+    """
+
+    code = 503
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for genai.GenerativeModel with the same
+    generate_content / generate_content_async surface (including
+    stream=True). Latency, transient failures and stalls are injected so
+    timeouts, retries and hedging can be exercised without the network.
+
+    latency / jitter are seconds; failure_rate is the chance a call raises
+    a 503; stall_rate is the chance a call hangs for `stall` seconds (or
+    until cancelled). The answer quotes the prompt length, so tests can
+    tell prompts apart.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall: float = 3600.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _plan(self) -> tuple[float, bool]:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            if self._rng.random() < self.stall_rate:
+                delay = self.stall
+            return delay, self._rng.random() < self.failure_rate
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        return f"Fake answer for a {len(prompt)}-character prompt."
+
+    @staticmethod
+    def _chunks(answer: str) -> list:
+        return [SimpleNamespace(parts=[word], text=f"{word} ") for word in answer.split()]
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options=None):
+        delay, fail = self._plan()
+        timeout = (request_options or {}).get("timeout")
+        time.sleep(delay if timeout is None else min(delay, timeout))
+        if timeout is not None and delay > timeout:
+            raise TimeoutError("fake Gemini call timed out")
+        if fail:
+            raise FakeServiceUnavailable("fake Gemini is unavailable")
+        answer = self._answer(prompt)
+        return iter(self._chunks(answer)) if stream else SimpleNamespace(text=answer)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, request_options=None):
+        delay, fail = self._plan()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeServiceUnavailable("fake Gemini is unavailable")
+        answer = self._answer(prompt)
+        if not stream:
+            return SimpleNamespace(text=answer)
+
+        async def chunks():
+            for chunk in self._chunks(answer):
+                await asyncio.sleep(0)
+                yield chunk
+
+        return chunks()
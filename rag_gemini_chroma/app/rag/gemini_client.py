@@ -0,0 +1,250 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from app.concurrency import pool_limiter
+
+# HTTP-style status codes (google.api_core errors carry one as .code) that
+# are worth retrying: request timeout, rate limit and server-side failures
+TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "code", None) in TRANSIENT_CODES
+
+
+class GeminiClient:
+    """
+    Long-lived wrapper around one GenerativeModel. Every call gets a
+    deadline, transient failures are retried with jittered exponential
+    backoff, and with hedging on, a second request is sent once the first
+    has run longer than the recent p95 latency; whichever answers first
+    wins and the other is cancelled. In-flight async calls share the
+    "generate" pool limit; a stream holds it only while the request is
+    being opened.
+    """
+
+    def __init__(
+        self,
+        model_factory,
+        timeout: float,
+        deadline: float,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        hedge_min_samples: int = 20,
+    ):
+        self.model_factory = model_factory
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=500)
+        self._stats_lock = threading.Lock()
+        self._counts = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self.model_factory()
+        return self._model
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _record_latency(self, seconds: float):
+        with self._stats_lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """
+        Wait before hedging: the recent latency quantile, or the minimum
+        delay until there are enough samples to trust it
+        """
+        with self._stats_lock:
+            samples = list(self._latencies)
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_min_delay
+        return max(self.hedge_min_delay, float(np.quantile(samples, self.hedge_quantile)))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # ------------------------------------------------------------------
+    # Async path (used by the API)
+    # ------------------------------------------------------------------
+
+    async def _call(self, prompt: str, timeout: float) -> str:
+        async with pool_limiter("generate"):
+            started = time.perf_counter()
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt, request_options={"timeout": timeout}),
+                timeout,
+            )
+            text = response.text
+        self._record_latency(time.perf_counter() - started)
+        return text
+
+    async def _hedged_call(self, prompt: str, timeout: float) -> str:
+        delay = self.hedge_delay()
+        if not self.hedge or delay >= timeout:
+            return await self._call(prompt, timeout)
+
+        primary = asyncio.create_task(self._call(prompt, timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            # Under saturation a hedge would only queue behind other calls
+            if not done and pool_limiter("generate").available_tokens > 0:
+                self._count("hedges")
+                tasks.add(asyncio.create_task(self._call(prompt, timeout - delay)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def generate(self, prompt: str) -> str:
+        self._count("calls")
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            try:
+                return await self._hedged_call(prompt, min(self.timeout, remaining))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self._count("timeouts")
+                pause = self._backoff(attempt)
+                if not is_transient(e) or attempt >= self.max_retries or time.monotonic() + pause >= give_up_at:
+                    self._count("failures")
+                    raise
+            attempt += 1
+            self._count("retries")
+            await asyncio.sleep(pause)
+
+    async def stream(self, prompt: str):
+        """
+        Yield answer text as it arrives. Failures before the first piece
+        are retried like generate(); once text has been sent, an error
+        ends the stream instead. Streams are not hedged.
+
+        The pool limit is released before the first yield: a
+        CapacityLimiter can only be released by the task that acquired
+        it, and an abandoned stream may be finalized by another task.
+        """
+        self._count("calls")
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            yielded = False
+            try:
+                async with pool_limiter("generate"):
+                    started = time.perf_counter()
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(
+                            prompt, stream=True, request_options={"timeout": min(self.timeout, remaining)}
+                        ),
+                        min(self.timeout, remaining),
+                    )
+                chunks = aiter(response)
+                while True:
+                    left = give_up_at - time.monotonic()
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), max(0.0, left))
+                    except StopAsyncIteration:
+                        break
+                    # Safety / finish chunks carry no text parts
+                    if chunk.parts:
+                        yielded = True
+                        yield chunk.text
+                self._record_latency(time.perf_counter() - started)
+                return
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self._count("timeouts")
+                pause = self._backoff(attempt)
+                if yielded or not is_transient(e) or attempt >= self.max_retries or time.monotonic() + pause >= give_up_at:
+                    self._count("failures")
+                    raise
+            attempt += 1
+            self._count("retries")
+            await asyncio.sleep(pause)
+
+    # ------------------------------------------------------------------
+    # Blocking path (scripts and the sync pipeline)
+    # ------------------------------------------------------------------
+
+    def generate_blocking(self, prompt: str) -> str:
+        """
+        generate() for callers without an event loop: same deadline and
+        retries, no hedging, and outside the async concurrency cap.
+        """
+        self._count("calls")
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - time.monotonic()
+            try:
+                started = time.perf_counter()
+                response = self.model.generate_content(
+                    prompt, request_options={"timeout": min(self.timeout, remaining)}
+                )
+                self._record_latency(time.perf_counter() - started)
+                return response.text
+            except Exception as e:
+                pause = self._backoff(attempt)
+                if not is_transient(e) or attempt >= self.max_retries or time.monotonic() + pause >= give_up_at:
+                    self._count("failures")
+                    raise
+            attempt += 1
+            self._count("retries")
+            time.sleep(pause)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counts = dict(self._counts)
+            samples = list(self._latencies)
+        latency = {}
+        if samples:
+            latency = {
+                "p50_seconds": round(float(np.quantile(samples, 0.5)), 3),
+                "p95_seconds": round(float(np.quantile(samples, 0.95)), 3),
+            }
+        return {
+            **counts,
+            **latency,
+            "hedge_enabled": self.hedge,
+            "hedge_delay_seconds": round(self.hedge_delay(), 3),
+        }
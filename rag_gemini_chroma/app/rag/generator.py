@@ -1,14 +1,57 @@
-import google.generativeai as genai
-from app.config import GOOGLE_API_KEY
+import time
+from contextlib import aclosing
 
-# Configure Gemini
-genai.configure(api_key=GOOGLE_API_KEY)
+from app.config import (
+    GEMINI_BACKOFF_BASE_SECONDS,
+    GEMINI_BACKOFF_MAX_SECONDS,
+    GEMINI_DEADLINE_SECONDS,
+    GEMINI_FAKE,
+    GEMINI_FAKE_LATENCY_MS,
+    GEMINI_HEDGE_ENABLED,
+    GEMINI_HEDGE_MIN_DELAY_SECONDS,
+    GEMINI_HEDGE_QUANTILE,
+    GEMINI_MAX_RETRIES,
+    GEMINI_MODEL_NAME,
+    GEMINI_TIMEOUT_SECONDS,
+    GOOGLE_API_KEY,
+)
+from app.metrics import PROMPT_TOKENS, stage_timer
+from app.rag.context_builder import estimate_tokens
+from app.rag.gemini_client import GeminiClient
 
-# Free working model
-MODEL_NAME = "gemini-3-flash-preview"
+def _build_model():
+    if GEMINI_FAKE:
+        from app.rag.fake_gemini import FakeGenerativeModel
 
-def generate_answer(context: str, question: str, chat_history: str = ""):
-    prompt = f"""
+        return FakeGenerativeModel(latency=GEMINI_FAKE_LATENCY_MS / 1000)
+
+    import google.generativeai as genai
+
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+# Configured and built on first use (or by warm-up), then reused
+gemini_client = GeminiClient(
+    model_factory=_build_model,
+    timeout=GEMINI_TIMEOUT_SECONDS,
+    deadline=GEMINI_DEADLINE_SECONDS,
+    max_retries=GEMINI_MAX_RETRIES,
+    backoff_base=GEMINI_BACKOFF_BASE_SECONDS,
+    backoff_max=GEMINI_BACKOFF_MAX_SECONDS,
+    hedge=GEMINI_HEDGE_ENABLED,
+    hedge_quantile=GEMINI_HEDGE_QUANTILE,
+    hedge_min_delay=GEMINI_HEDGE_MIN_DELAY_SECONDS,
+)
+
+def get_model():
+    return gemini_client.model
+
+def warm_up():
+    # Only builds the client; no request is sent, so no quota is spent
+    get_model()
+
+def build_prompt(context: str, question: str, chat_history: str = "") -> str:
+    return f"""
 You are a helpful assistant.
 
 Conversation history:
@@ -24,7 +67,36 @@ Question:
 {question}
 """
 
-    model = genai.GenerativeModel(MODEL_NAME)
-    response = model.generate_content(prompt)
+def _prompt(context: str, question: str, chat_history: str) -> str:
+    prompt = build_prompt(context, question, chat_history)
+    PROMPT_TOKENS.observe(estimate_tokens(prompt))
+    return prompt
+
+def generate_answer(context: str, question: str, chat_history: str = ""):
+    """
+    Blocking generation for callers without an event loop
+    """
+    prompt = _prompt(context, question, chat_history)
+
+    with stage_timer("generate").time():
+        return gemini_client.generate_blocking(prompt)
+
+async def generate_answer_async(context: str, question: str, chat_history: str = ""):
+    prompt = _prompt(context, question, chat_history)
+
+    with stage_timer("generate").time():
+        return await gemini_client.generate(prompt)
+
+async def generate_answer_stream(context: str, question: str, chat_history: str = ""):
+    """
+    Yield the answer text piece by piece as Gemini produces it
+    """
+    prompt = _prompt(context, question, chat_history)
+
+    started = time.perf_counter()
+    async with aclosing(gemini_client.stream(prompt)) as stream:
+        async for text in stream:
+            yield text
 
-    return response.text
+    # Only completed streams are timed, from request to last chunk
+    stage_timer("generate").observe(time.perf_counter() - started)
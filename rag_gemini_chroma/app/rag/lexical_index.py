@@ -0,0 +1,164 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.config import LEXICAL_INDEX_MMAP_BYTES, LEXICAL_INDEX_PATH
+
+# Keep part numbers and error codes ("AB-1234", "E_42") as single tokens
+_TOKENIZER = "unicode61 remove_diacritics 2 tokenchars '-_'"
+_QUERY_TERM = re.compile(r"[\w\-]+(?:\.[\w\-]+)*")
+_MAX_QUERY_TERMS = 32
+
+
+def _match_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 OR-query of quoted terms, so user input
+    can never be parsed as FTS5 syntax
+    """
+    terms = dict.fromkeys(term.lower() for term in _QUERY_TERM.findall(text))
+    quoted = ['"' + term.replace('"', '""') + '"' for term in list(terms)[:_MAX_QUERY_TERMS]]
+    return " OR ".join(quoted)
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk text, kept in an SQLite FTS5 table that is
+    updated incrementally as chunks are written or deleted. Readers use
+    per-thread connections with the database memory-mapped.
+    """
+
+    def __init__(self, path: str, mmap_bytes: int):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schema_ready = False
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            if not self._schema_ready:
+                # Chunk ids live in a plain table sharing the FTS rowid, so
+                # deletes by id use an index instead of scanning the FTS table
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS chunk_meta ("
+                    " rowid INTEGER PRIMARY KEY,"
+                    " chunk_id TEXT NOT NULL UNIQUE,"
+                    " source TEXT, page INTEGER, offset INTEGER)"
+                )
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                    f" document, tokenize = \"{_TOKENIZER}\")"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS initialized (flag INTEGER PRIMARY KEY)")
+                conn.commit()
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    @classmethod
+    def _add(cls, conn, ids, documents, metadatas):
+        # Re-adding an id replaces its text
+        cls._delete(conn, ids)
+        for chunk_id, document, md in zip(ids, documents, metadatas):
+            md = md or {}
+            cursor = conn.execute(
+                "INSERT INTO chunk_meta (chunk_id, source, page, offset) VALUES (?, ?, ?, ?)",
+                (chunk_id, md.get("source"), md.get("page"), md.get("offset")),
+            )
+            conn.execute(
+                "INSERT INTO chunks (rowid, document) VALUES (?, ?)",
+                (cursor.lastrowid, document or ""),
+            )
+
+    def add(self, ids, documents, metadatas):
+        with self._write_lock:
+            conn = self._connection()
+            self._add(conn, ids, documents, metadatas)
+            conn.commit()
+
+    @staticmethod
+    def _delete(conn, ids):
+        for chunk_id in ids:
+            row = conn.execute("SELECT rowid FROM chunk_meta WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM chunks WHERE rowid = ?", row)
+                conn.execute("DELETE FROM chunk_meta WHERE rowid = ?", row)
+
+    def delete(self, ids):
+        with self._write_lock:
+            conn = self._connection()
+            self._delete(conn, ids)
+            conn.commit()
+
+    def reset(self):
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM chunk_meta")
+            conn.execute("INSERT OR IGNORE INTO initialized VALUES (1)")
+            conn.commit()
+
+    def is_initialized(self) -> bool:
+        # Checked on every hybrid query; the marker is never removed
+        if not self._initialized:
+            self._initialized = self._connection().execute("SELECT 1 FROM initialized").fetchone() is not None
+        return self._initialized
+
+    def rebuild(self, record_pages, if_missing: bool = False):
+        """
+        Index an existing collection from scratch; record_pages yields
+        get() results with documents and metadatas. The whole rebuild is
+        one transaction, committed with the initialized marker only once
+        every page is indexed, and writes made meanwhile wait for it.
+        With if_missing, a rebuild that finds the index already built
+        (e.g. by a concurrent caller) does nothing.
+        """
+        with self._write_lock:
+            if if_missing and self.is_initialized():
+                return
+            conn = self._connection()
+            try:
+                conn.execute("DELETE FROM chunks")
+                conn.execute("DELETE FROM chunk_meta")
+                for records in record_pages:
+                    self._add(conn, records["ids"], records["documents"], records["metadatas"])
+                conn.execute("INSERT OR IGNORE INTO initialized VALUES (1)")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def search(self, text: str, limit: int) -> list[dict]:
+        """
+        Best BM25 matches first, as {"id", "document", "metadata", "score"}
+        """
+        query = _match_query(text)
+        if not query:
+            return []
+
+        rows = self._connection().execute(
+            "SELECT m.chunk_id, m.source, m.page, m.offset, c.document, c.score"
+            " FROM (SELECT rowid, document, bm25(chunks) AS score FROM chunks"
+            "       WHERE chunks MATCH ? ORDER BY score LIMIT ?) AS c"
+            " JOIN chunk_meta AS m ON m.rowid = c.rowid"
+            " ORDER BY c.score",
+            (query, limit),
+        ).fetchall()
+
+        hits = []
+        for chunk_id, source, page, offset, document, score in rows:
+            metadata = {"source": source}
+            if page is not None:
+                metadata.update(page=page, offset=offset)
+            hits.append({"id": chunk_id, "document": document, "metadata": metadata, "score": -score})
+        return hits
+
+
+lexical_index = LexicalIndex(path=LEXICAL_INDEX_PATH, mmap_bytes=LEXICAL_INDEX_MMAP_BYTES)
@@ -0,0 +1,589 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from app.config import (
+    LOCAL_INDEX_COMPACT_DEAD_FRACTION,
+    LOCAL_INDEX_DIR,
+    LOCAL_INDEX_IVF,
+    LOCAL_INDEX_IVF_MIN_ROWS,
+    LOCAL_INDEX_IVF_NPROBE,
+)
+
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.sqlite3"
+IVF_FILE = "ivf.npz"
+
+# Rows scored per matrix product in exact search, to bound temporary memory
+_BLOCK_ROWS = 65536
+
+
+def _vectors_file(generation: int) -> str:
+    # Each compaction writes the live rows to a new file, so processes
+    # still mapping the previous one keep reading valid data
+    return f"vectors.{generation}.f32" if generation else VECTORS_FILE
+
+
+def _normalize(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    # Best k of one query's scores, highest first
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[keep], rows[keep]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], rows[order]
+
+
+class LocalVectorIndex:
+    """
+    Single-node vector store: unit-normalized float32 embeddings in an
+    append-only file that is memory-mapped for search, plus a SQLite
+    sidecar mapping matrix rows to ids, documents and metadata.
+
+    Search is a NumPy matrix product over the mapped rows with exact
+    top-k, or, once an IVF index has been built for a large collection,
+    a scan of the nearest inverted lists plus any rows appended since.
+    Deletes and upserts tombstone old rows instead of rewriting the file;
+    once the dead fraction reaches compact_dead_fraction, the live rows
+    are rewritten to a new file and renumbered.
+
+    Several processes can open the same directory: the matrix lives in
+    the shared page cache, and each process remaps when SQLite reports a
+    commit from another connection. Writes are serialized by SQLite.
+    Reads use their own connections and never wait for a write: a search
+    maps rows to records only if no compaction has renumbered them since
+    its snapshot was taken, and otherwise retries on a fresh one.
+
+    Exposes the subset of the Chroma collection API that
+    app.rag.vectorstore uses, so it can stand in for a collection.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ivf: bool = False,
+        ivf_min_rows: int = 200000,
+        nprobe: int = 16,
+        compact_dead_fraction: float = 0.25,
+    ):
+        self.directory = Path(directory)
+        self.ivf_enabled = ivf
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = max(1, nprobe)
+        self.compact_dead_fraction = compact_dead_fraction
+
+        self._write_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._conn = None
+        self._snapshot_conn = None
+        self._readers = threading.local()
+        self._data_version = None
+        self._dimension = None
+        self._generation = 0
+        self._matrix = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ivf = None
+        self._ivf_mtime = None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _open(self) -> sqlite3.Connection:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Writers wait for each other, and a compaction can hold the lock a while
+        conn = sqlite3.connect(
+            self.directory / RECORDS_FILE, check_same_thread=False, isolation_level=None, timeout=300
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL UNIQUE,"
+            " document TEXT,"
+            " metadata TEXT)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS tombstones (row INTEGER PRIMARY KEY)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # The write connection; callers hold self._write_lock
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # One read connection per thread; under WAL it reads the last
+        # commit while a write transaction is open elsewhere
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = self._open()
+        return conn
+
+    @contextmanager
+    def _reading(self, conn=None):
+        """
+        A read transaction, so every SELECT in it sees the same commit
+        """
+        conn = conn or self._reader()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def _meta(self, conn, key: str) -> int | None:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn, key: str, value: int):
+        conn.execute(
+            "INSERT INTO meta VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _vectors_path(self, conn) -> Path:
+        return self.directory / _vectors_file(self._meta(conn, "generation") or 0)
+
+    def _refresh(self, force: bool = False) -> tuple:
+        """
+        Remap the matrix and reload tombstones if any connection (this
+        process or another) has committed since the last look. Returns a
+        consistent (matrix, alive, ivf, generation) snapshot for searching;
+        row numbers in it are only valid while generation is current.
+        """
+        with self._snapshot_lock:
+            if self._snapshot_conn is None:
+                self._snapshot_conn = self._open()
+            conn = self._snapshot_conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if force or version != self._data_version:
+                self._data_version = version
+                self._reload(conn)
+            self._refresh_ivf()
+            # Lists built before the last compaction refer to old row numbers
+            ivf = self._ivf
+            if ivf is not None and int(ivf.get("generation", 0)) != self._generation:
+                ivf = None
+            return self._matrix, self._alive, ivf, self._generation
+
+    def _reload(self, conn):
+        missing = None
+        while True:
+            with self._reading(conn):
+                rows = self._meta(conn, "rows") or 0
+                dimension = self._meta(conn, "dimension")
+                generation = self._meta(conn, "generation") or 0
+                dead = np.fromiter((row for (row,) in conn.execute("SELECT row FROM tombstones")), dtype=np.int64)
+
+            path = self.directory / _vectors_file(generation)
+            try:
+                if rows and dimension:
+                    # Never map past the end of the file, even if a crash
+                    # left it shorter than the committed row count
+                    rows = min(rows, path.stat().st_size // (dimension * 4))
+                matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dimension)) if rows else None
+            except FileNotFoundError:
+                if generation != missing:
+                    # Most likely compacted away since the read; look again
+                    missing = generation
+                    continue
+                rows, matrix = 0, None
+            break
+
+        alive = np.ones(rows, dtype=bool)
+        alive[dead[dead < rows]] = False
+        self._dimension = dimension
+        self._generation = generation
+        self._matrix, self._alive = matrix, alive
+
+    def _refresh_ivf(self):
+        path = self.directory / IVF_FILE
+        mtime = path.stat().st_mtime_ns if self.ivf_enabled and path.exists() else None
+        if mtime != self._ivf_mtime:
+            self._ivf_mtime = mtime
+            self._ivf = dict(np.load(path)) if mtime is not None else None
+
+    @contextmanager
+    def _transaction(self):
+        """
+        A write transaction; BEGIN IMMEDIATE serializes writers across
+        processes. The snapshot is reloaded afterwards.
+        """
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._refresh(force=True)
+
+    def _tombstone(self, conn, ids):
+        rows = [
+            row for (row,) in conn.execute(
+                f"SELECT row FROM records WHERE id IN ({','.join('?' * len(ids))})", ids
+            )
+        ]
+        conn.executemany("INSERT OR IGNORE INTO tombstones (row) VALUES (?)", [(row,) for row in rows])
+        conn.executemany("DELETE FROM records WHERE row = ?", [(row,) for row in rows])
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        if not ids:
+            return
+        vectors = _normalize(embeddings)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._transaction() as conn:
+            dimension = self._meta(conn, "dimension")
+            if dimension is None:
+                dimension = vectors.shape[1]
+                self._set_meta(conn, "dimension", dimension)
+            elif vectors.shape[1] != dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {dimension}")
+
+            for start in range(0, len(ids), 500):
+                self._tombstone(conn, ids[start:start + 500])
+
+            first_row = self._meta(conn, "rows") or 0
+            # Bytes past the committed row count are leftovers of an
+            # interrupted write, so new rows overwrite them
+            with open(self._vectors_path(conn), "ab+") as f:
+                f.seek(first_row * dimension * 4)
+                f.truncate()
+                f.write(vectors.tobytes())
+                f.flush()
+                # The rows must be on disk before SQLite commits a row
+                # count that covers them
+                os.fsync(f.fileno())
+
+            conn.executemany(
+                "INSERT INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (first_row + i, chunk_id, document, json.dumps(metadata) if metadata else None)
+                    for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ],
+            )
+            self._set_meta(conn, "rows", first_row + len(ids))
+        self._maybe_compact()
+
+    # Ids are unique, so adding an existing id replaces it like upsert
+    add = upsert
+
+    def delete(self, ids):
+        with self._transaction() as conn:
+            for start in range(0, len(ids), 500):
+                self._tombstone(conn, list(ids[start:start + 500]))
+        self._maybe_compact()
+
+    def clear(self):
+        with self._transaction() as conn:
+            generation = self._meta(conn, "generation") or 0
+            conn.execute("DELETE FROM records")
+            conn.execute("DELETE FROM tombstones")
+            conn.execute("DELETE FROM meta")
+            # Rows are numbered from 0 again, so searches holding the old
+            # numbers must see a new generation
+            self._set_meta(conn, "generation", generation + 1)
+            for path in [*self.directory.glob("vectors*.f32"), self.directory / IVF_FILE]:
+                path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def _maybe_compact(self):
+        if self.compact_dead_fraction <= 0:
+            return
+        _, alive, _, _ = self._refresh()
+        if len(alive) and 1 - alive.sum() / len(alive) >= self.compact_dead_fraction:
+            self.compact()
+
+    def compact(self) -> dict:
+        """
+        Rewrite the live rows to a new vectors file, renumber them in
+        order and drop the tombstones. An IVF index is rebuilt with the
+        same number of lists, since its row numbers no longer apply.
+        """
+        with self._transaction() as conn:
+            rows = self._meta(conn, "rows") or 0
+            dimension = self._meta(conn, "dimension")
+            generation = self._meta(conn, "generation") or 0
+            old_path = self._vectors_path(conn)
+            if rows:
+                # Rows missing from a file cut short by a crash have no vector
+                rows = min(rows, old_path.stat().st_size // (dimension * 4) if old_path.exists() else 0)
+                conn.execute("DELETE FROM records WHERE row >= ?", (rows,))
+            live = np.fromiter((row for (row,) in conn.execute("SELECT row FROM records ORDER BY row")), dtype=np.int64)
+
+            new_path = self.directory / _vectors_file(generation + 1)
+            with open(new_path, "wb") as f:
+                if len(live):
+                    old = np.memmap(old_path, dtype=np.float32, mode="r", shape=(rows, dimension))
+                    for start in range(0, len(live), _BLOCK_ROWS):
+                        f.write(np.ascontiguousarray(old[live[start:start + _BLOCK_ROWS]]).tobytes())
+                    del old
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Live rows only move down, and in ascending order, so no
+            # renumbered row collides with one not yet moved
+            conn.executemany(
+                "UPDATE records SET row = ? WHERE row = ?",
+                ((new_row, int(old_row)) for new_row, old_row in enumerate(live) if new_row != old_row),
+            )
+            conn.execute("DELETE FROM tombstones")
+            self._set_meta(conn, "rows", len(live))
+            self._set_meta(conn, "generation", generation + 1)
+
+        # Processes still mapping the old file keep it alive until they remap
+        old_path.unlink(missing_ok=True)
+        ivf_path = self.directory / IVF_FILE
+        result = {"rows_before": rows, "rows": len(live)}
+        if ivf_path.exists():
+            lists = len(np.load(ivf_path)["centroids"])
+            ivf_path.unlink()
+            if len(live):
+                result["ivf"] = self.build_ivf(lists=lists)
+        return result
+
+    # ------------------------------------------------------------------
+    # Reads (Chroma-shaped results)
+    # ------------------------------------------------------------------
+
+    def _read(self, sql: str, params=()) -> list:
+        return self._reader().execute(sql, params).fetchall()
+
+    def count(self) -> int:
+        return self._read("SELECT COUNT(*) FROM records")[0][0]
+
+    def _records(self, rows, generation: int) -> dict[int, tuple] | None:
+        """
+        Records for rows of a snapshot, or None if a compaction has
+        renumbered the rows since (the caller retries on a fresh one)
+        """
+        rows = [int(row) for row in rows]
+        found = {}
+        with self._reading() as conn:
+            if (self._meta(conn, "generation") or 0) != generation:
+                return None
+            for start in range(0, len(rows), 500):
+                batch = rows[start:start + 500]
+                for row, chunk_id, document, metadata in conn.execute(
+                    f"SELECT row, id, document, metadata FROM records WHERE row IN ({','.join('?' * len(batch))})",
+                    batch,
+                ):
+                    found[row] = (chunk_id, document, json.loads(metadata) if metadata else None)
+        return found
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=None):
+        """
+        Records by id, or in insertion order filtered by an equality
+        `where` on metadata fields ({"source": ...}, {"job_id": ...})
+        """
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        for key, value in (where or {}).items():
+            clauses.append("json_extract(metadata, ?) = ?")
+            params.extend((f"$.{key}", value))
+
+        def select(conn, max_row=None) -> list:
+            where_sql, where_params = list(clauses), list(params)
+            if max_row is not None:
+                where_sql.append("row < ?")
+                where_params.append(max_row)
+            sql = "SELECT row, id, document, metadata FROM records"
+            if where_sql:
+                sql += " WHERE " + " AND ".join(where_sql)
+            sql += " ORDER BY row"
+            if limit is not None or offset:
+                sql += " LIMIT ? OFFSET ?"
+                where_params.extend((-1 if limit is None else limit, offset or 0))
+            return conn.execute(sql, where_params).fetchall()
+
+        if "embeddings" in include:
+            # Row numbers must match the snapshot the vectors come from:
+            # read at its generation, and only rows it has vectors for
+            while True:
+                matrix, _, _, generation = self._refresh()
+                with self._reading() as conn:
+                    if (self._meta(conn, "generation") or 0) == generation:
+                        found = select(conn, max_row=0 if matrix is None else len(matrix))
+                        break
+        else:
+            found = select(self._reader())
+
+        result = {
+            "ids": [chunk_id for _, chunk_id, _, _ in found],
+            "documents": None,
+            "metadatas": None,
+            "embeddings": None,
+        }
+        if "documents" in include:
+            result["documents"] = [document for _, _, document, _ in found]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(metadata) if metadata else None for _, _, _, metadata in found]
+        if "embeddings" in include:
+            rows = np.array([row for row, _, _, _ in found], dtype=np.int64)
+            result["embeddings"] = matrix[rows] if len(rows) else np.empty((0, self._dimension or 0), np.float32)
+        return result
+
+    def peek(self, limit=10):
+        return self.get(include=("documents", "metadatas", "embeddings"), limit=limit)
+
+    @staticmethod
+    def _exact(matrix, alive, queries: np.ndarray, k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        best = [(np.empty(0, np.float32), np.empty(0, np.int64)) for _ in queries]
+        for start in range(0, len(matrix), _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, len(matrix))
+            scores = matrix[start:stop] @ queries.T  # (block rows, queries)
+            scores[~alive[start:stop]] = -np.inf
+            rows = np.arange(start, stop)
+            for q in range(len(queries)):
+                block_scores, block_rows = _top_k(scores[:, q], rows, k)
+                best[q] = _top_k(
+                    np.concatenate((best[q][0], block_scores)),
+                    np.concatenate((best[q][1], block_rows)),
+                    k,
+                )
+        return best
+
+    def _ivf_search(self, matrix, alive, ivf, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        centroids, offsets, list_rows = ivf["centroids"], ivf["offsets"], ivf["rows"]
+        probes = np.argsort(-(centroids @ query))[:self.nprobe]
+        candidates = [list_rows[offsets[p]:offsets[p + 1]] for p in probes]
+        # Rows appended after the build aren't in any list yet
+        candidates.append(np.arange(int(ivf["built_rows"]), len(matrix)))
+        rows = np.unique(np.concatenate(candidates))
+        rows = rows[alive[rows]]
+        return _top_k(matrix[rows] @ query, rows, k)
+
+    def query(self, query_embeddings, n_results=10, include=None):
+        queries = _normalize(query_embeddings)
+        while True:
+            matrix, alive, ivf, generation = self._refresh()
+            if matrix is None:
+                return {"ids": [[] for _ in queries], "documents": [[] for _ in queries],
+                        "metadatas": [[] for _ in queries], "distances": [[] for _ in queries]}
+
+            if ivf is not None and len(matrix) >= self.ivf_min_rows:
+                hits = [self._ivf_search(matrix, alive, ivf, query, n_results) for query in queries]
+            else:
+                hits = self._exact(matrix, alive, queries, n_results)
+
+            records = self._records(np.unique(np.concatenate([rows for _, rows in hits])), generation)
+            if records is not None:
+                break
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for scores, rows in hits:
+            keep = [(score, records[row]) for score, row in zip(scores, rows) if np.isfinite(score) and row in records]
+            result["ids"].append([record[0] for _, record in keep])
+            result["documents"].append([record[1] for _, record in keep])
+            result["metadatas"].append([record[2] for _, record in keep])
+            result["distances"].append([float(1 - score) for score, _ in keep])
+        return result
+
+    # ------------------------------------------------------------------
+    # IVF
+    # ------------------------------------------------------------------
+
+    def build_ivf(self, lists: int | None = None, iterations: int = 10, sample: int = 100000, seed: int = 0) -> dict:
+        """
+        Train k-means centroids on a sample of live rows and write the
+        inverted lists. Rows added later are scanned exactly until the
+        next build.
+        """
+        matrix, alive, _, generation = self._refresh()
+        rows = np.flatnonzero(alive)
+        if len(rows) == 0:
+            raise ValueError("Index is empty")
+        lists = lists or max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(seed)
+
+        training = matrix[np.sort(rng.choice(rows, size=min(sample, len(rows)), replace=False))]
+        centroids = training[rng.choice(len(training), size=min(lists, len(training)), replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(training @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = training[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            block = rows[start:start + _BLOCK_ROWS]
+            assignment[start:start + len(block)] = np.argmax(matrix[block] @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+
+        tmp_path = self.directory / f"ivf.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path, centroids=centroids, offsets=offsets, rows=rows[order],
+            built_rows=len(matrix), generation=generation,
+        )
+        os.replace(tmp_path, self.directory / IVF_FILE)
+        return {"lists": len(centroids), "rows": len(rows)}
+
+    def stats(self) -> dict:
+        _, alive, ivf, _ = self._refresh()
+        return {
+            "rows": len(alive),
+            "live": int(alive.sum()),
+            "dead": int(len(alive) - alive.sum()),
+            "dimension": self._dimension,
+            "ivf": ivf is not None,
+            "ivf_rows": int(ivf["built_rows"]) if ivf is not None else 0,
+        }
+
+
+local_index = LocalVectorIndex(
+    LOCAL_INDEX_DIR,
+    ivf=LOCAL_INDEX_IVF,
+    ivf_min_rows=LOCAL_INDEX_IVF_MIN_ROWS,
+    nprobe=LOCAL_INDEX_IVF_NPROBE,
+    compact_dead_fraction=LOCAL_INDEX_COMPACT_DEAD_FRACTION,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local memory-mapped vector index tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-ivf", help="train and write the IVF lists")
+    build.add_argument("--lists", type=int, help="number of inverted lists (default sqrt(rows))")
+    build.add_argument("--iterations", type=int, default=10)
+    commands.add_parser("compact", help="rewrite live rows and drop deleted ones")
+    commands.add_parser("stats", help="row counts and index state")
+    args = parser.parse_args()
+
+    if args.command == "build-ivf":
+        print(json.dumps(local_index.build_ivf(lists=args.lists, iterations=args.iterations), indent=2))
+    elif args.command == "compact":
+        print(json.dumps(local_index.compact(), indent=2))
+    else:
+        print(json.dumps(local_index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_MODEL_NAME,
+    ONNX_INTRA_OP_THREADS,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZED,
+)
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "embedder.json"
+
+
+class OnnxEmbedder:
+    """
+    all-MiniLM-L6-v2 on onnxruntime: transformer forward pass, attention-
+    masked mean pooling and L2 normalization, matching the sentence-
+    transformers pipeline. Exposes the subset of the SentenceTransformer
+    API that app.rag.embeddings uses.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.dimension = config["dimension"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode(self, texts, batch_size: int = 32, **_ignored) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size=batch_size)[0]
+
+        # Batch similar lengths together to keep padding small
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            output[rows] = self._encode_batch([texts[i] for i in rows])
+        return output
+
+
+def load_embedder() -> OnnxEmbedder:
+    return OnnxEmbedder(ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, intra_op_threads=ONNX_INTRA_OP_THREADS)
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, quantize: bool = True):
+    """
+    Export the sentence-transformers model to ONNX (plus an int8 dynamic-
+    quantized copy) together with its tokenizer
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    with open(os.path.join(output_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "model_name": EMBEDDING_MODEL_NAME,
+                "max_seq_length": st_model.max_seq_length,
+                "dimension": st_model.get_sentence_embedding_dimension(),
+            },
+            f,
+            indent=2,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            model_path,
+            os.path.join(output_dir, QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+
+def parity_check(texts: list[str], quantized: bool = ONNX_QUANTIZED, threshold: float = 0.99) -> dict:
+    """
+    Cosine agreement between the PyTorch and ONNX vectors for the same texts
+    """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu").encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True
+    )
+    candidate = OnnxEmbedder(ONNX_MODEL_DIR, quantized=quantized, intra_op_threads=ONNX_INTRA_OP_THREADS).encode(texts)
+    cosines = np.sum(reference * candidate, axis=1)
+    return {
+        "quantized": quantized,
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "threshold": threshold,
+        "passed": bool(cosines.min() >= threshold),
+    }
+
+
+def main():
+    # Parity and throughput checks against synthetic text live in
+    # benchmarks/onnx_embedder.py
+    parser = argparse.ArgumentParser(description="ONNX embedding backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="export the model (and an int8 copy) to ONNX_MODEL_DIR")
+    export.add_argument("--no-quantize", action="store_true")
+
+    args = parser.parse_args()
+    export_onnx(quantize=not args.no_quantize)
+    print(f"Exported to {ONNX_MODEL_DIR}")
+
+
+if __name__ == "__main__":
+    main()
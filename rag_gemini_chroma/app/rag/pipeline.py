@@ -1,7 +1,109 @@
-from app.rag.retriever import retrieve_context
-from app.rag.generator import generate_answer
+import asyncio
+import time
+from contextlib import aclosing
+
+from app.concurrency import run_blocking
+from app.config import QUERY_BATCH_GENERATE_CONCURRENCY
+from app.rag.answer_cache import answer_cache
+from app.rag.retriever import retrieve, retrieve_many
+from app.rag.generator import generate_answer, generate_answer_async, generate_answer_stream
 
 def rag_pipeline(question: str, chat_history: str = ""):
-    context = retrieve_context(question)
-    answer = generate_answer(context, question, chat_history)
+    # Read before retrieval, so an invalidation that lands while retrieving
+    # keeps an answer built from the old chunks out of the cache
+    generation = answer_cache.generation
+    retrieval = retrieve(question)
+    cached = answer_cache.lookup(retrieval.embedding, retrieval.ids, chat_history)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    answer = generate_answer(retrieval.context, question, chat_history)
+    answer_cache.store(
+        retrieval.embedding, retrieval.ids, chat_history, answer,
+        latency=time.perf_counter() - started, generation=generation,
+    )
     return answer
+
+async def _answer(retrieval, question: str, chat_history: str, generation: int):
+    # generation is the cache generation read before retrieval
+    cached = answer_cache.lookup(retrieval.embedding, retrieval.ids, chat_history)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    answer = await generate_answer_async(retrieval.context, question, chat_history)
+    answer_cache.store(
+        retrieval.embedding, retrieval.ids, chat_history, answer,
+        latency=time.perf_counter() - started, generation=generation,
+    )
+    return answer
+
+async def rag_pipeline_async(question: str, chat_history: str = ""):
+    """
+    Same as rag_pipeline, with retrieval run in its pool and generation
+    on the async Gemini client
+    """
+    generation = answer_cache.generation
+    retrieval = await run_blocking("retrieve", retrieve, question)
+    return await _answer(retrieval, question, chat_history, generation)
+
+async def rag_pipeline_batch(
+    questions: list[str],
+    chat_history: str = "",
+    max_concurrency: int = QUERY_BATCH_GENERATE_CONCURRENCY,
+) -> list[dict]:
+    """
+    Answer many questions: one batched retrieval, then generation fanned
+    out with at most max_concurrency calls in flight. Results keep the
+    input order; a failed item carries an error instead of an answer.
+    """
+    generation = answer_cache.generation
+    try:
+        retrievals = await run_blocking("retrieve", retrieve_many, questions)
+    except Exception as e:
+        return [{"question": question, "error": str(e)} for question in questions]
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def answer_one(question, retrieval):
+        async with semaphore:
+            try:
+                return {"question": question, "answer": await _answer(retrieval, question, chat_history, generation)}
+            except Exception as e:
+                return {"question": question, "error": str(e)}
+
+    return await asyncio.gather(*(
+        answer_one(question, retrieval) for question, retrieval in zip(questions, retrievals)
+    ))
+
+async def _cached_stream(answer: str):
+    yield answer
+
+async def _caching_stream(stream, retrieval, chat_history: str, generation: int):
+    # Only a stream that ran to completion is cached
+    started = time.perf_counter()
+    parts = []
+    # Closed here, in the request's task, if the client goes away
+    async with aclosing(stream):
+        async for text in stream:
+            parts.append(text)
+            yield text
+    answer_cache.store(
+        retrieval.embedding, retrieval.ids, chat_history, "".join(parts),
+        latency=time.perf_counter() - started, generation=generation,
+    )
+
+async def rag_pipeline_stream(question: str, chat_history: str = ""):
+    """
+    Retrieve context up front (so retrieval errors surface before any
+    output), then return an async iterator over the streamed answer.
+    """
+    generation = answer_cache.generation
+    retrieval = await run_blocking("retrieve", retrieve, question)
+    cached = answer_cache.lookup(retrieval.embedding, retrieval.ids, chat_history)
+    if cached is not None:
+        return _cached_stream(cached)
+
+    stream = generate_answer_stream(retrieval.context, question, chat_history)
+    return _caching_stream(stream, retrieval, chat_history, generation)
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import (
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_MAX_ENTRIES,
+    RERANK_ENABLED,
+    RERANK_MAX_MS,
+    RERANK_MODEL_NAME,
+)
+
+
+class Reranker:
+    """
+    Scores (question, chunk) pairs with a small local cross-encoder on
+    CPU. Scores are cached per (question, chunk id), and scoring stops
+    at max_ms. Candidates left unscored keep their retrieval order after
+    the scored ones.
+    """
+
+    def __init__(self, model_name: str, batch_size: int, max_ms: float, cache_size: int, enabled: bool = True):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_seconds = max_ms / 1000
+        self.cache_size = cache_size
+        self.enabled = enabled
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warm_up(self):
+        if self.enabled:
+            self.get_model().predict([("warm-up", "warm-up")])
+
+    def _cached(self, key):
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, keys, scores):
+        with self._cache_lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = float(score)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, question: str, candidates: list[tuple[str, str, dict]], keep: int) -> list[tuple[str, str, dict]]:
+        """
+        candidates are (chunk id, document, metadata) in retrieval order;
+        returns the best `keep` of them
+        """
+        deadline = time.perf_counter() + self.max_seconds
+        scores = {}
+        pending = []
+        for chunk_id, document, _ in candidates:
+            score = self._cached((question, chunk_id))
+            if score is None:
+                pending.append((chunk_id, document))
+            else:
+                scores[chunk_id] = score
+
+        model = self.get_model()
+        for start in range(0, len(pending), self.batch_size):
+            if time.perf_counter() >= deadline:
+                break
+            batch = pending[start:start + self.batch_size]
+            batch_scores = model.predict(
+                [(question, document) for _, document in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            keys = [(question, chunk_id) for chunk_id, _ in batch]
+            self._store(keys, batch_scores)
+            scores.update((chunk_id, float(score)) for (chunk_id, _), score in zip(batch, batch_scores))
+
+        scored = sorted((c for c in candidates if c[0] in scores), key=lambda c: scores[c[0]], reverse=True)
+        unscored = [c for c in candidates if c[0] not in scores]
+        return (scored + unscored)[:keep]
+
+
+reranker = Reranker(
+    model_name=RERANK_MODEL_NAME,
+    batch_size=RERANK_BATCH_SIZE,
+    max_ms=RERANK_MAX_MS,
+    cache_size=RERANK_CACHE_MAX_ENTRIES,
+    enabled=RERANK_ENABLED,
+)
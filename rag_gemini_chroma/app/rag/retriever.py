@@ -1,27 +1,123 @@
-from app.rag.embeddings import embed_text
-from app.rag.chroma_client import get_chroma_client
-from app.config import COLLECTION_NAME
+from typing import NamedTuple
 
-def retrieve_context(question: str, top_k: int = 5) -> str:
+import numpy as np
+
+from app.config import HYBRID_CANDIDATES, HYBRID_RETRIEVAL, RERANK_KEEP, RERANK_POOL_SIZE, RRF_K
+from app.rag.context_builder import build_context
+from app.rag.embed_scheduler import embed_scheduler
+from app.rag.embeddings import embed_texts
+from app.metrics import stage_timer
+from app.rag.lexical_index import lexical_index
+from app.rag.reranker import reranker
+from app.rag.vectorstore import ensure_lexical_index, query_vectors, query_vectors_many
+
+class Retrieval(NamedTuple):
+    embedding: np.ndarray  # question embedding
+    ids: list[str]         # retrieved chunk ids, best first
+    documents: list[str]
+    metadatas: list[dict]
+    context: str           # merged, deduplicated, budget-trimmed prompt context
+    tokens_saved: int      # estimated tokens saved versus joining the raw chunks
+
+def _pool_size(top_k: int) -> int:
+    # With reranking on, retrieval fetches a wider pool for the cross-encoder
+    return max(top_k, RERANK_POOL_SIZE) if reranker.enabled else top_k
+
+def _candidate_count(top_k: int) -> int:
+    pool = _pool_size(top_k)
+    return max(pool, HYBRID_CANDIDATES) if HYBRID_RETRIEVAL else pool
+
+def _fuse(question: str, ids, documents, metadatas, top_k: int) -> list[tuple[str, str, dict]]:
+    """
+    Reciprocal rank fusion of the dense hits with BM25 hits for the
+    question. Without hybrid retrieval this is just the dense top_k.
+    """
+    dense = [(chunk_id, doc, md or {}) for chunk_id, doc, md in zip(ids, documents, metadatas)]
+    if not HYBRID_RETRIEVAL:
+        return dense[:top_k]
+
+    # Without warm-up, a collection that predates the index is indexed here
+    ensure_lexical_index()
+    with stage_timer("lexical_search").time():
+        lexical_hits = lexical_index.search(question, limit=_candidate_count(top_k))
+    lexical = [(hit["id"], hit["document"], hit["metadata"]) for hit in lexical_hits]
+
+    scores: dict[str, float] = {}
+    hits: dict[str, tuple[str, str, dict]] = {}
+    for ranked in (dense, lexical):
+        for rank, hit in enumerate(ranked):
+            scores[hit[0]] = scores.get(hit[0], 0.0) + 1.0 / (RRF_K + rank + 1)
+            hits.setdefault(hit[0], hit)
+
+    # sorted() is stable, so ties keep dense order first
+    best = sorted(hits, key=lambda chunk_id: scores[chunk_id], reverse=True)[:top_k]
+    return [hits[chunk_id] for chunk_id in best]
+
+def _retrieval(question: str, embedding: np.ndarray, ids, documents, metadatas, top_k: int) -> Retrieval:
+    fused = _fuse(question, ids, documents, metadatas, _pool_size(top_k))
+    if reranker.enabled:
+        with stage_timer("rerank").time():
+            fused = reranker.rerank(question, fused, keep=min(top_k, RERANK_KEEP))
+    fused_documents = [doc for _, doc, _ in fused]
+    fused_metadatas = [md for _, _, md in fused]
+    context = build_context(fused_documents, fused_metadatas)
+    return Retrieval(
+        embedding=embedding,
+        ids=[chunk_id for chunk_id, _, _ in fused],
+        documents=fused_documents,
+        metadatas=fused_metadatas,
+        context=context.text,
+        tokens_saved=context.tokens_saved,
+    )
+
+def retrieve(question: str, top_k: int = 5) -> Retrieval:
     """
     1. Embed the question
-    2. Query ChromaDB with the embedding
-    3. Return joined documents
+    2. Query ChromaDB with the embedding (fused with BM25 hits when
+       hybrid retrieval is on)
+    3. Return the hits along with the joined context
     """
 
-    # ✅ STEP 1: Convert text → embedding
-    query_embedding = embed_text(question)
+    # ✅ STEP 1: Convert text → embedding (batched with concurrent queries)
+    query_embedding = embed_scheduler.embed(question)
 
-    # ✅ STEP 2: Query ChromaDB with VECTOR
-    client = get_chroma_client()
-    collection = client.get_collection(COLLECTION_NAME)
+    # ✅ STEP 2: Query ChromaDB with VECTOR (cached collection handle)
+    results = query_vectors(query_embedding, top_k=_candidate_count(top_k))
 
-    results = collection.query(
-        query_embeddings=[query_embedding],  # ✅ LIST[float]
-        n_results=top_k
+    # ✅ STEP 3: Return STRING (not list) as the context, built within the token budget
+    return _retrieval(
+        question,
+        query_embedding,
+        results["ids"][0],
+        results["documents"][0],
+        (results.get("metadatas") or [[]])[0],
+        top_k,
     )
 
-    documents = results["documents"][0]
+def retrieve_many(questions: list[str], top_k: int = 5) -> list[Retrieval]:
+    """
+    Batched retrieve(): one encode for all questions and one
+    multi-vector Chroma query
+    """
+
+    if not questions:
+        return []
+
+    query_embeddings = embed_texts(questions)
+    results = query_vectors_many(query_embeddings, top_k=_candidate_count(top_k))
+    metadatas = results.get("metadatas") or [[] for _ in questions]
 
-    # ✅ STEP 3: Return STRING (not list)
-    return "\n\n".join(documents)
+    return [
+        _retrieval(
+            question,
+            query_embeddings[row],
+            results["ids"][row],
+            results["documents"][row],
+            metadatas[row],
+            top_k,
+        )
+        for row, question in enumerate(questions)
+    ]
+
+def retrieve_context(question: str, top_k: int = 5) -> str:
+    return retrieve(question, top_k=top_k).context
@@ -1,35 +1,191 @@
-from app.rag.chroma_client import get_chroma_client
-from app.config import COLLECTION_NAME
+import threading
 
-def get_collection():
-    client = get_chroma_client()
+from app.rag.chroma_client import (
+    DROPPED_ERRORS,
+    RECONNECT_ERRORS,
+    NotFoundError,
+    get_chroma_client,
+    reset_chroma_client,
+)
+from app.rag.collection_stats import collection_stats
+from app.rag.lexical_index import lexical_index
+from app.config import COLLECTION_NAME, VECTOR_BACKEND
+from app.metrics import stage_timer
+
+_collection = None
+_lock = threading.Lock()
+
+def _create_collection(client):
     return client.get_or_create_collection(
         name=COLLECTION_NAME,
         metadata={"hnsw:space": "cosine"}
     )
 
+def _open_collection():
+    """
+    The configured backend's collection: Chroma, or the in-process
+    memory-mapped index, which implements the same calls
+    """
+    if VECTOR_BACKEND == "local":
+        from app.rag.local_index import local_index
+        return local_index
+    return _create_collection(get_chroma_client())
+
+def get_collection():
+    """
+    Return the cached collection handle, creating it on first use
+    """
+    global _collection
+    if _collection is None:
+        with _lock:
+            if _collection is None:
+                _collection = _open_collection()
+    return _collection
+
+def reset_collection(reconnect: bool = False):
+    """
+    Invalidate the cached collection handle (and optionally the client)
+    """
+    global _collection
+    with _lock:
+        _collection = None
+    if reconnect:
+        reset_chroma_client()
+
+def _run(operation, write=False):
+    """
+    Run operation(collection), reconnecting once if the cached client or
+    collection handle has gone stale (server restart, collection recreated
+    by another process, dropped HTTP connection). Writes are only retried
+    when they cannot have reached the server; other errors (bad ids,
+    dimension mismatch, ...) are raised as they are.
+    """
+    retryable = RECONNECT_ERRORS if write else RECONNECT_ERRORS + DROPPED_ERRORS
+    try:
+        return operation(get_collection())
+    except retryable:
+        reset_collection(reconnect=True)
+        return operation(get_collection())
+
+def clear_collection():
+    """
+    Delete and recreate the collection, replacing the cached handle
+    """
+    global _collection
+    with _lock:
+        if VECTOR_BACKEND == "local":
+            _collection = _open_collection()
+            _collection.clear()
+        else:
+            client = get_chroma_client()
+            try:
+                client.delete_collection(COLLECTION_NAME)
+            except NotFoundError:
+                # Already gone (e.g. cleared by another worker)
+                pass
+            _collection = _create_collection(client)
+        collection_stats.reset()
+        lexical_index.reset()
+    return _collection
+
 def add_documents(ids, documents, embeddings, metadatas):
-    collection = get_collection()
-    collection.add(
-        ids=ids,
-        documents=documents,
-        embeddings=embeddings,
-        metadatas=metadatas
-    )
+    with stage_timer("chroma_add").time():
+        _run(lambda collection: collection.add(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
+        ), write=True)
+    collection_stats.add(metadatas, documents)
+    lexical_index.add(ids, documents, metadatas)
+
+def upsert_documents(ids, documents, embeddings, metadatas):
+    with stage_timer("chroma_add").time():
+        _run(lambda collection: collection.upsert(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
+        ), write=True)
+    # Ids are fresh uuids, so every upsert is an insert for the stats
+    collection_stats.add(metadatas, documents)
+    lexical_index.add(ids, documents, metadatas)
+
+def iter_records(include=("documents", "metadatas"), page_size=1000, where=None):
+    """
+    Page through the collection (or the records matching `where`);
+    yields the raw get() results
+    """
+    offset = 0
+    while True:
+        records = _run(lambda collection: collection.get(
+            where=where,
+            include=list(include),
+            limit=page_size,
+            offset=offset
+        ))
+        if not records["ids"]:
+            return
+        yield records
+        offset += len(records["ids"])
+
+def iter_source_records(source, include=("documents",), page_size=1000):
+    return iter_records(include=include, page_size=page_size, where={"source": source})
+
+def delete_ids(ids, batch_size=5000):
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        records = _run(lambda collection: collection.get(
+            ids=batch,
+            include=["documents", "metadatas"]
+        ))
+        _run(lambda collection: collection.delete(ids=batch), write=True)
+        collection_stats.subtract(records["metadatas"], records["documents"])
+        lexical_index.delete(batch)
+
+def get_page(offset=0, limit=20):
+    return _run(lambda collection: collection.get(
+        include=["documents", "metadatas"],
+        limit=limit,
+        offset=offset
+    ))
+
+def ensure_stats():
+    """
+    Build the per-source stats once for a collection that predates them
+    """
+    if not collection_stats.is_initialized():
+        collection_stats.rebuild(iter_records(), if_missing=True)
+
+def ensure_lexical_index():
+    """
+    Build the BM25 index once for a collection that predates it (from
+    warm-up, or lazily by the first hybrid query)
+    """
+    if not lexical_index.is_initialized():
+        lexical_index.rebuild(iter_records(), if_missing=True)
 
 def query_vectors(query_embedding, top_k=5):
-    collection = get_collection()
-    return collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k
-    )
+    with stage_timer("chroma_query").time():
+        return _run(lambda collection: collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k
+        ))
+
+def query_vectors_many(query_embeddings, top_k=5):
+    """
+    One multi-vector query; results hold one list per query embedding
+    """
+    with stage_timer("chroma_query").time():
+        return _run(lambda collection: collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k
+        ))
 
 def get_collection_stats():
-    collection = get_collection()
     return {
-        "count": collection.count()
+        "count": _run(lambda collection: collection.count())
     }
 
 def peek_documents(limit=5):
-    collection = get_collection()
-    return collection.peek(limit=limit)
+    return _run(lambda collection: collection.peek(limit=limit))
@@ -0,0 +1,83 @@
+"""
+Chunking strategy throughput over already-extracted page text.
+
+    python -m benchmarks.chunking --pages 500
+    python -m benchmarks.chunking some.pdf other.pdf --strategy recursive
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Iterable
+
+from app.ingestion.chunking import STRATEGIES, PageText, get_tokenizer, iter_chunks
+from benchmarks.synthetic import page_texts
+
+
+def synthetic_pages(page_count: int, chars_per_page: int = 3000) -> list[PageText]:
+    pages = []
+    offset = 0
+    for number, text in enumerate(page_texts(page_count, chars_per_page), start=1):
+        pages.append(PageText(number, offset, text))
+        offset += len(text) + 1
+    return pages
+
+
+def benchmark(pages: list[PageText], strategies: Iterable[str] = tuple(STRATEGIES), repeats: int = 3) -> dict:
+    """
+    Chunks/s and MB/s per strategy over already-extracted page text, so
+    PDF parsing cost is excluded. Also reports the largest chunk in model
+    tokens, which shows whether a strategy would overflow the embedder.
+    """
+    total_chars = sum(len(page.text) for page in pages)
+    results = {}
+    for name in strategies:
+        best = float("inf")
+        chunks = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            chunks = list(iter_chunks(pages, strategy=name))
+            best = min(best, time.perf_counter() - start)
+
+        lengths = [len(chunk.text) for chunk in chunks]
+        tokens = [len(encoding.ids) for encoding in get_tokenizer().encode_batch(
+            [chunk.text for chunk in chunks], add_special_tokens=False
+        )]
+        results[name] = {
+            "seconds": round(best, 4),
+            "chunks": len(chunks),
+            "chunks_per_second": round(len(chunks) / best, 1),
+            "mb_per_second": round(total_chars / best / 1e6, 2),
+            "avg_chunk_chars": round(sum(lengths) / len(lengths), 1) if lengths else 0.0,
+            "max_chunk_tokens": max(tokens, default=0),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking strategy throughput benchmark")
+    parser.add_argument("pdfs", nargs="*", help="PDFs to chunk (default: synthetic page text)")
+    parser.add_argument("--pages", type=int, default=500, help="synthetic page count when no PDFs are given")
+    parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES), help="repeat to pick several (default: all)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pdfs:
+        from app.ingestion.pdf_loader import iter_pdf_pages
+
+        # Concatenate the PDFs into one page stream with running offsets
+        pages = []
+        offset = 0
+        for path in args.pdfs:
+            for page in iter_pdf_pages(path):
+                pages.append(PageText(len(pages) + 1, offset, page.text))
+                offset += len(page.text) + 1
+    else:
+        pages = synthetic_pages(args.pages)
+
+    report = benchmark(pages, strategies=args.strategy or tuple(STRATEGIES), repeats=args.repeats)
+    print(json.dumps({"pages": len(pages), "chars": sum(len(page.text) for page in pages), "strategies": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Parity and throughput of the ONNX embedding backend against PyTorch, on
+synthetic text. Export the model first with
+`python -m app.rag.onnx_embedder export`.
+
+    python -m benchmarks.onnx_embedder parity --quantized
+    python -m benchmarks.onnx_embedder bench --texts 2048
+"""
+
+import argparse
+import json
+import os
+import time
+
+from app.config import EMBEDDING_MODEL_NAME, ONNX_INTRA_OP_THREADS, ONNX_MODEL_DIR
+from app.rag.onnx_embedder import QUANTIZED_MODEL_FILE, OnnxEmbedder, parity_check
+from benchmarks.synthetic import texts as synthetic_texts
+
+
+def benchmark(texts: list[str], batch_size: int = 64, repeats: int = 3) -> dict:
+    """
+    Texts/s for the PyTorch backend and both ONNX variants
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backends = {"torch": SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")}
+    backends["onnx"] = OnnxEmbedder(ONNX_MODEL_DIR, intra_op_threads=ONNX_INTRA_OP_THREADS)
+    if os.path.exists(os.path.join(ONNX_MODEL_DIR, QUANTIZED_MODEL_FILE)):
+        backends["onnx_int8"] = OnnxEmbedder(ONNX_MODEL_DIR, quantized=True, intra_op_threads=ONNX_INTRA_OP_THREADS)
+
+    results = {}
+    for name, model in backends.items():
+        model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.encode(texts, batch_size=batch_size)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"seconds": round(best, 4), "texts_per_second": round(len(texts) / best, 1)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX embedding backend checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parity = commands.add_parser("parity", help="compare ONNX vectors against PyTorch")
+    parity.add_argument("--texts", type=int, default=256)
+    parity.add_argument("--quantized", action="store_true")
+    parity.add_argument("--threshold", type=float, default=0.99)
+
+    bench = commands.add_parser("bench", help="embedding throughput per backend")
+    bench.add_argument("--texts", type=int, default=2048)
+    bench.add_argument("--batch-size", type=int, default=64)
+
+    args = parser.parse_args()
+    if args.command == "parity":
+        report = parity_check(synthetic_texts(args.texts), quantized=args.quantized, threshold=args.threshold)
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0 if report["passed"] else 1)
+    print(json.dumps(benchmark(synthetic_texts(args.texts), batch_size=args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
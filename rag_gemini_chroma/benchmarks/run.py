@@ -0,0 +1,293 @@
+"""
+Offline component benchmarks for ingestion and retrieval.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output results.json --baseline baseline.json
+
+Everything runs locally: PDFs are synthetic, Chroma is a PersistentClient
+in a temporary directory and Gemini is replaced by the offline fake. The embedding
+model must already be in the local Hugging Face cache (or exported for the
+ONNX backend). With --baseline, metrics are compared against an earlier
+results file and the exit status is 1 when any regressed past --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.synthetic import make_pdf, questions, sentence, unit_vectors
+
+DEFAULT_SCALES = "1000,100000,1000000"
+DEFAULT_BATCH_SIZES = "1,8,32,64,128"
+FILL_BATCH_SIZE = 5000
+
+
+def _isolate(workdir: str):
+    # Must run before anything under app/ is imported: config is read once
+    os.environ.update({
+        "CHROMA_DB_DIR": os.path.join(workdir, "chroma_db"),
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"),
+        "USE_CHROMA_HTTP": "false",
+        "STATS_DB_PATH": os.path.join(workdir, "collection_stats.sqlite3"),
+        "LEXICAL_INDEX_PATH": os.path.join(workdir, "lexical_index.sqlite3"),
+        "PAGE_STORE_DIR": os.path.join(workdir, "page_store"),
+        "EMBED_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        # Cache hits would hide the cost being measured
+        "EMBED_CACHE_ENABLED": "false",
+        "ANSWER_CACHE_ENABLED": "false",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        "GEMINI_FAKE": "true",
+        "GEMINI_FAKE_LATENCY_MS": "0",
+    })
+
+
+def _latency(samples: list[float]) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def bench_load(workdir: str, pages: int) -> tuple[dict, list[str]]:
+    from app.ingestion.pdf_loader import load_and_split_pdf
+
+    path = make_pdf(os.path.join(workdir, "synthetic.pdf"), pages)
+    start = time.perf_counter()
+    chunks = load_and_split_pdf(path)
+    seconds = time.perf_counter() - start
+    return {
+        "pages": pages,
+        "chunks": len(chunks),
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 1),
+    }, chunks
+
+
+def bench_ingest(chunks: list[str]) -> dict:
+    from app.ingestion.ingest import ingest_pdf
+
+    start = time.perf_counter()
+    count = ingest_pdf(chunks, source="synthetic.pdf")
+    seconds = time.perf_counter() - start
+    return {
+        "chunks": count,
+        "seconds": round(seconds, 4),
+        "chunks_per_second": round(count / seconds, 1),
+    }
+
+
+def bench_embed(chunks: list[str], batch_sizes: list[int], repeats: int) -> dict:
+    from app.rag.embeddings import embed_texts
+
+    texts = (chunks * (max(batch_sizes) // max(1, len(chunks)) + 1))[:max(batch_sizes)]
+    embed_texts(texts[:8])  # warm-up: model load and first-call allocation
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = texts[:batch_size]
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            embed_texts(batch, batch_size=batch_size)
+            samples.append(time.perf_counter() - start)
+        results[str(batch_size)] = {
+            **_latency(samples),
+            "texts_per_second": round(batch_size / float(np.median(samples)), 1),
+        }
+    return results
+
+
+def _fill(target: int, dimension: int, rng: np.random.Generator) -> float:
+    """
+    Top the collection up to `target` vectors with random unit vectors and
+    synthetic sentences. Returns the seconds spent writing.
+    """
+    from app.rag.vectorstore import add_documents, get_collection_stats
+
+    text_rng = random.Random(target)
+    current = get_collection_stats()["count"]
+    start = time.perf_counter()
+    while current < target:
+        size = min(FILL_BATCH_SIZE, target - current)
+        add_documents(
+            ids=[f"fill-{current + i}" for i in range(size)],
+            documents=[sentence(text_rng) for _ in range(size)],
+            embeddings=unit_vectors(size, dimension, rng),
+            metadatas=[{"source": "fill", "page": 1, "offset": 0} for _ in range(size)],
+        )
+        current += size
+    return time.perf_counter() - start
+
+
+def bench_retrieve(scales: list[int], query_count: int) -> dict:
+    from app.rag.embeddings import embedding_dimension
+    from app.rag.retriever import retrieve_context
+
+    rng = np.random.default_rng(0)
+    dimension = embedding_dimension()
+    queries = questions(query_count)
+    results = {}
+    for scale in sorted(scales):
+        fill_seconds = _fill(scale, dimension, rng)
+        for question in queries[:5]:
+            retrieve_context(question)  # warm-up: index load into memory
+
+        samples = []
+        for question in queries:
+            start = time.perf_counter()
+            retrieve_context(question)
+            samples.append(time.perf_counter() - start)
+        results[str(scale)] = {
+            "vectors": scale,
+            "fill_seconds": round(fill_seconds, 2),
+            **_latency(samples),
+            "queries_per_second": round(len(samples) / sum(samples), 1),
+        }
+    return results
+
+
+def bench_pipeline(query_count: int) -> dict:
+    from app.rag.pipeline import rag_pipeline
+
+    samples = []
+    for question in questions(query_count, seed=2):
+        start = time.perf_counter()
+        rag_pipeline(question)
+        samples.append(time.perf_counter() - start)
+    return {**_latency(samples), "queries_per_second": round(len(samples) / sum(samples), 1)}
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """
+    Per-metric change against the baseline. Only rates (*_per_second,
+    higher is better) and latencies (*_ms, lower is better) are compared;
+    counts and setup times are context, not performance.
+    """
+    current = _flatten(results["results"])
+    previous = _flatten(baseline["results"])
+    rows = []
+    for name in sorted(current.keys() & previous.keys()):
+        higher_is_better = name.endswith("_per_second")
+        if not higher_is_better and not name.endswith("_ms"):
+            continue
+        before, after = previous[name], current[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        rows.append({
+            "metric": name,
+            "baseline": before,
+            "current": after,
+            "change": round(change, 4),
+            "regressed": regressed,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion and retrieval benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown per metric")
+    parser.add_argument("--pages", type=int, default=200, help="pages in the synthetic PDF")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated collection sizes")
+    parser.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES, help="comma-separated embed batch sizes")
+    parser.add_argument("--queries", type=int, default=200, help="queries per retrieval scale")
+    parser.add_argument("--repeats", type=int, default=20, help="timed runs per embed batch size")
+    parser.add_argument("--skip", action="append", default=[], choices=["load", "ingest", "embed", "retrieve", "pipeline"])
+    parser.add_argument("--keep", action="store_true", help="keep the temporary data directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    _isolate(workdir)
+    from app import config
+
+    results = {}
+    try:
+        # The loaded chunks feed the ingest and embed stages, so loading
+        # always runs; --skip load only leaves it out of the results
+        load, chunks = bench_load(workdir, args.pages)
+        if "load" not in args.skip:
+            results["load"] = load
+            print(f"load: {load['pages_per_second']} pages/s", file=sys.stderr)
+        if "ingest" not in args.skip:
+            results["ingest"] = bench_ingest(chunks)
+            print(f"ingest: {results['ingest']['chunks_per_second']} chunks/s", file=sys.stderr)
+        if "embed" not in args.skip:
+            batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+            results["embed"] = bench_embed(chunks, batch_sizes, args.repeats)
+            print("embed: done", file=sys.stderr)
+        if "retrieve" not in args.skip:
+            scales = [int(scale) for scale in args.scales.split(",")]
+            results["retrieve"] = bench_retrieve(scales, args.queries)
+            print("retrieve: done", file=sys.stderr)
+        if "pipeline" not in args.skip:
+            results["pipeline"] = bench_pipeline(args.queries)
+            print(f"pipeline: {results['pipeline']['p50_ms']} ms p50", file=sys.stderr)
+    finally:
+        if args.keep:
+            print(f"data kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedding_model": config.EMBEDDING_MODEL_NAME,
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "vector_backend": config.VECTOR_BACKEND,
+            "chunk_strategy": config.CHUNK_STRATEGY,
+            "hybrid_retrieval": config.HYBRID_RETRIEVAL,
+            "rerank_enabled": config.RERANK_ENABLED,
+            "embed_scheduler_enabled": config.EMBED_SCHEDULER_ENABLED,
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(report, baseline, args.tolerance)
+        for row in report["comparison"]:
+            flag = "REGRESSED" if row["regressed"] else ""
+            print(f"{row['metric']:<40} {row['baseline']:>12} {row['current']:>12} {row['change']:+.1%} {flag}")
+        if any(row["regressed"] for row in report["comparison"]):
+            exit_code = 1
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+    raise SystemExit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
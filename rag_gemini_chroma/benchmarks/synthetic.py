@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+WORDS = (
+    "pump valve pressure error code reset procedure manual section warranty "
+    "filter sensor calibration firmware update part number motor bearing "
+    "voltage circuit relay fuse housing gasket seal torque inspection "
+    "maintenance schedule cleaning replacement installation alarm display"
+).split()
+
+
+def sentence(rng: random.Random, min_words: int = 6, max_words: int = 20) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))).capitalize() + "."
+
+
+def texts(count: int, min_words: int = 8, max_words: int = 90, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))) for _ in range(count)]
+
+
+def page_texts(count: int, chars_per_page: int = 3000, seed: int = 0) -> list[str]:
+    """
+    Extracted-page-like text: paragraphs of a few sentences separated by
+    blank lines, at least chars_per_page characters per page
+    """
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        paragraphs = []
+        size = 0
+        while size < chars_per_page:
+            paragraph = " ".join(sentence(rng, 6, 24) for _ in range(rng.randint(2, 6)))
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 2
+        pages.append("\n\n".join(paragraphs))
+    return pages
+
+
+def questions(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"What does the manual say about {' '.join(rng.choices(WORDS, k=3))}?"
+        for _ in range(count)
+    ]
+
+
+def _page_lines(rng: random.Random, lines: int, line_chars: int) -> list[str]:
+    text = " ".join(sentence(rng) for _ in range(lines * line_chars // 80 + 1))
+    return [text[i:i + line_chars] for i in range(0, lines * line_chars, line_chars)]
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 40, line_chars: int = 80, seed: int = 0) -> str:
+    """
+    Write a text-only PDF of synthetic manual prose (about
+    lines_per_page * line_chars characters per page) that pypdf can
+    extract. Built by hand so no PDF writer dependency is needed.
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for _ in range(pages):
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>".encode()
+        )
+        body = " T* ".join(f"({line}) Tj" for line in _page_lines(rng, lines_per_page, line_chars))
+        stream = f"BT /F1 9 Tf 11 TL 36 756 Td {body} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    with open(path, "wb") as f:
+        f.write(output)
+    return path
+
+
+def unit_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
@@ -2,13 +2,14 @@ import requests
 import streamlit as st
 
 from ui_utils import (
-    api_query,
+    api_query_stream,
     api_upload_pdf,
     ensure_state,
     load_css,
     set_background,
     show_loader,
     sidebar_nav,
+    track_job,
 )
 
 CHATBOT_BG = r"C:/BayGrape/rag_gemini_chroma/background_assets/image 3.jpg"
@@ -33,15 +34,18 @@ def render_chatbot() -> None:
             loader = show_loader("Uploading...")
             try:
                 payload = api_upload_pdf(attached)
-                st.success(
-                    f"Embedded `{payload.get('source', attached.name)}` with "
-                    f"{payload.get('chunks_ingested', 0)} chunks."
-                )
             except requests.RequestException as exc:
                 st.error(f"Upload failed: {exc}")
+                payload = None
             finally:
                 loader.empty()
 
+            if payload:
+                try:
+                    track_job(payload["job_id"], payload.get("source", attached.name))
+                except requests.RequestException as exc:
+                    st.error(f"Lost track of the embedding job: {exc}")
+
     for user_text, bot_text in st.session_state.chat_history:
         with st.chat_message("user"):
             st.markdown(user_text)
@@ -54,15 +58,22 @@ def render_chatbot() -> None:
             st.markdown(prompt)
 
         loader = show_loader("Thinking...")
-        try:
-            answer = api_query(prompt)
-        except requests.RequestException as exc:
-            answer = f"Query failed: {exc}"
-        finally:
-            loader.empty()
+
+        def answer_tokens():
+            # Keep the loader up only until the first token arrives
+            try:
+                for text in api_query_stream(prompt):
+                    loader.empty()
+                    yield text
+            finally:
+                loader.empty()
 
         with st.chat_message("assistant"):
-            st.markdown(answer)
+            try:
+                answer = st.write_stream(answer_tokens())
+            except requests.RequestException as exc:
+                answer = f"Query failed: {exc}"
+                st.markdown(answer)
         st.session_state.chat_history.append((prompt, answer))
 
 
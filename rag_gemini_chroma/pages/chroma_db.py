@@ -12,6 +12,7 @@ from ui_utils import (
 )
 
 CHROMA_BG = r"C:/BayGrape/rag_gemini_chroma/background_assets/image4.avif"
+PAGE_SIZE = 40
 
 
 def render_chroma() -> None:
@@ -38,16 +39,22 @@ def render_chroma() -> None:
         try:
             api_clear_chroma()
             st.session_state.chroma_loaded = None
+            st.session_state.chroma_offset = 0
             st.success("Collection cleared.")
         except requests.RequestException as exc:
             st.error(f"Clear failed: {exc}")
         finally:
             loader.empty()
 
+    if load_clicked:
+        st.session_state.chroma_offset = 0
+
     if load_clicked or st.session_state.chroma_loaded is None:
         loader = show_loader("Loading...")
         try:
-            st.session_state.chroma_loaded = api_chroma_summary(limit=40)
+            st.session_state.chroma_loaded = api_chroma_summary(
+                limit=PAGE_SIZE, offset=st.session_state.chroma_offset
+            )
         except requests.RequestException as exc:
             st.error(f"Load failed: {exc}")
         finally:
@@ -79,5 +86,19 @@ def render_chroma() -> None:
         else:
             st.info("No chunk rows available.")
 
+        offset = data.get("offset", 0)
+        next_offset = data.get("next_offset")
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if st.button("Previous Page", disabled=offset == 0, use_container_width=True):
+                st.session_state.chroma_offset = max(0, offset - PAGE_SIZE)
+                st.session_state.chroma_loaded = None
+                st.rerun()
+        with next_col:
+            if st.button("Next Page", disabled=next_offset is None, use_container_width=True):
+                st.session_state.chroma_offset = next_offset
+                st.session_state.chroma_loaded = None
+                st.rerun()
+
 
 render_chroma()
@@ -1,7 +1,7 @@
 import requests
 import streamlit as st
 
-from ui_utils import api_upload_pdf, ensure_state, load_css, set_background, show_loader, sidebar_nav
+from ui_utils import api_upload_pdf, ensure_state, load_css, set_background, show_loader, sidebar_nav, track_job
 
 EMBED_BG = r"C:/BayGrape/rag_gemini_chroma/background_assets/image 2.jpg"
 
@@ -32,17 +32,20 @@ def render_embed() -> None:
             if not uploaded_pdf:
                 st.error("Please select a PDF file first.")
             else:
-                loader = show_loader("Embedding...")
+                loader = show_loader("Uploading...")
                 try:
                     payload = api_upload_pdf(uploaded_pdf)
-                    st.success(
-                        f"Embedded `{payload.get('source', uploaded_pdf.name)}` with "
-                        f"{payload.get('chunks_ingested', 0)} chunks."
-                    )
                 except requests.RequestException as exc:
-                    st.error(f"Embedding failed: {exc}")
+                    st.error(f"Upload failed: {exc}")
+                    payload = None
                 finally:
                     loader.empty()
 
+                if payload:
+                    try:
+                        track_job(payload["job_id"], payload.get("source", uploaded_pdf.name))
+                    except requests.RequestException as exc:
+                        st.error(f"Lost track of the embedding job: {exc}")
+
 
 render_embed()
@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+from app.rag.local_index import LocalVectorIndex, _vectors_file
+
+
+def _index(path, **kwargs) -> LocalVectorIndex:
+    kwargs.setdefault("compact_dead_fraction", 0)
+    return LocalVectorIndex(str(path), **kwargs)
+
+
+def _axis(i: int, dimension: int = 4) -> list[float]:
+    vector = [0.0] * dimension
+    vector[i] = 1.0
+    return vector
+
+
+def _fill(index, count: int = 4):
+    index.upsert(
+        ids=[f"c{i}" for i in range(count)],
+        documents=[f"doc {i}" for i in range(count)],
+        embeddings=[_axis(i) for i in range(count)],
+        metadatas=[{"source": "a.pdf", "n": i} for i in range(count)],
+    )
+
+
+def test_upsert_delete_compact_query_round_trip(tmp_path):
+    index = _index(tmp_path)
+    _fill(index)
+
+    result = index.query([_axis(2)], n_results=1)
+    assert result["ids"] == [["c2"]]
+    assert result["documents"] == [["doc 2"]]
+    assert result["metadatas"] == [[{"source": "a.pdf", "n": 2}]]
+    assert result["distances"][0][0] < 1e-6
+
+    # Replacing an id tombstones its old row
+    index.upsert(ids=["c2"], documents=["doc 2b"], embeddings=[_axis(3)], metadatas=[{"source": "b.pdf"}])
+    index.delete(["c3"])
+    assert index.count() == 3
+    assert index.query([_axis(3)], n_results=1)["documents"] == [["doc 2b"]]
+    assert index.stats()["dead"] == 2
+
+    assert index.compact() == {"rows_before": 5, "rows": 3}
+    assert index.stats()["dead"] == 0
+    assert index.query([_axis(3)], n_results=1)["ids"] == [["c2"]]
+    assert index.query([_axis(0)], n_results=3)["ids"][0][0] == "c0"
+
+    got = index.get(where={"source": "a.pdf"}, include=("documents", "embeddings"))
+    assert got["ids"] == ["c0", "c1"]
+    assert np.allclose(got["embeddings"], [_axis(0), _axis(1)])
+
+    # A second handle on the directory sees the same state
+    assert _index(tmp_path).get(ids=["c2"])["documents"] == ["doc 2b"]
+
+
+def test_rows_cut_short_by_a_crash_are_not_served(tmp_path):
+    index = _index(tmp_path)
+    _fill(index)
+
+    # As if the process died after committing rows whose vectors never
+    # reached the file
+    path = tmp_path / _vectors_file(0)
+    path.write_bytes(path.read_bytes()[: 2 * 4 * 4])
+
+    reopened = _index(tmp_path)
+    assert reopened.query([_axis(3)], n_results=4)["ids"] == [["c0", "c1"]]
+    assert reopened.get(include=("embeddings",))["ids"] == ["c0", "c1"]
+
+    assert reopened.compact()["rows"] == 2
+    assert reopened.count() == 2
+    reopened.upsert(ids=["c9"], documents=["doc 9"], embeddings=[_axis(3)])
+    assert reopened.query([_axis(3)], n_results=1)["ids"] == [["c9"]]
+
+
+def test_search_retries_when_rows_were_renumbered(tmp_path):
+    index = _index(tmp_path)
+    _fill(index)
+    index.delete(["c0", "c1"])
+    _, _, _, generation = index._refresh()
+
+    # Another process compacts: rows 2 and 3 become 0 and 1
+    _index(tmp_path).compact()
+
+    assert index._records([0, 1], generation) is None
+    assert index.query([_axis(3)], n_results=1)["ids"] == [["c3"]]
+
+
+def test_reads_do_not_wait_for_a_write(tmp_path):
+    index = _index(tmp_path)
+    _fill(index)
+
+    counts = []
+    with index._transaction() as conn:
+        conn.execute("DELETE FROM records")
+        reader = threading.Thread(target=lambda: counts.append(index.count()))
+        reader.start()
+        reader.join(timeout=5)
+        # The open transaction is not visible to readers yet
+        assert counts == [4]
+    assert index.count() == 0
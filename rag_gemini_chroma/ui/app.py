@@ -1,6 +1,13 @@
+import sys
+from pathlib import Path
+
 import requests
 import streamlit as st
 
+# Job tracking is shared with the main app's pages
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ui_utils import track_job
+
 UPLOAD_API = "http://127.0.0.1:8000/upload"
 QUERY_API = "http://127.0.0.1:8000/query"
 CHROMA_SUMMARY_API = "http://127.0.0.1:8000/chroma/summary"
@@ -8,6 +15,7 @@ CHROMA_CLEAR_API = "http://127.0.0.1:8000/chroma/clear"
 
 st.set_page_config(page_title="RAG Studio", page_icon="RAG", layout="wide")
 
+
 st.markdown(
     """
     <style>
@@ -120,11 +128,9 @@ if active_view == "ChatBot":
                         )
                         if upload_res.ok:
                             payload = upload_res.json()
-                            st.success(
-                                f"Embedded `{payload.get('source', selected_pdf.name)}` with "
-                                f"{payload.get('chunks_ingested', 0)} chunks."
-                            )
-                            st.session_state.show_attach = False
+                            job = track_job(payload["job_id"], payload.get("source", selected_pdf.name))
+                            if job is not None and job["state"] == "done":
+                                st.session_state.show_attach = False
                         else:
                             st.error(f"Upload failed: {upload_res.text}")
                     except Exception as e:
@@ -1,6 +1,13 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import requests
 
+# Job tracking is shared with the main app's pages
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ui_utils import track_job
+
 API_URL = "http://127.0.0.1:8000/upload"
 
 st.set_page_config(page_title="PDF Upload", page_icon="📄")
@@ -32,9 +39,10 @@ if upload_clicked:
                     timeout=300
                 )
 
-                if response.status_code == 200:
-                    data = response.json()
-                    st.success(data.get("status", "PDF uploaded successfully"))
+                if response.status_code == 202:
+                    # Queued: follow the ingestion job until it finishes
+                    payload = response.json()
+                    track_job(payload["job_id"], payload.get("source", uploaded_file.name))
                 else:
                     st.error(f"Upload failed (status {response.status_code})")
                     st.text(response.text)
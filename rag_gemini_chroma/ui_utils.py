@@ -1,5 +1,7 @@
 import base64
 import mimetypes
+import time
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -7,18 +9,25 @@ import requests
 import streamlit as st
 
 UPLOAD_API = "http://127.0.0.1:8000/upload"
+JOBS_API = "http://127.0.0.1:8000/jobs"
 QUERY_API = "http://127.0.0.1:8000/query"
+QUERY_STREAM_API = "http://127.0.0.1:8000/query/stream"
 CHROMA_SUMMARY_API = "http://127.0.0.1:8000/chroma/summary"
 CHROMA_CLEAR_API = "http://127.0.0.1:8000/chroma/clear"
 
 ROOT_DIR = Path(__file__).resolve().parent
 STYLE_FILE = ROOT_DIR / "static" / "style.css"
 LOADER_FILE = ROOT_DIR / "static" / "loader.css"
+JOB_POLL_SECONDS = 1.0
+# Give up watching (the job itself keeps running) after this long
+JOB_TRACK_TIMEOUT_SECONDS = 30 * 60
 def ensure_state() -> None:
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
     if "chroma_loaded" not in st.session_state:
         st.session_state.chroma_loaded = None
+    if "chroma_offset" not in st.session_state:
+        st.session_state.chroma_offset = 0
 
 
 def load_css() -> None:
@@ -130,6 +139,47 @@ def api_upload_pdf(uploaded_file) -> dict[str, Any]:
     return response.json()
 
 
+def api_job_status(job_id: str) -> dict[str, Any]:
+    response = requests.get(f"{JOBS_API}/{job_id}", timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def track_job(job_id: str, source: str, timeout: float = JOB_TRACK_TIMEOUT_SECONDS) -> dict[str, Any] | None:
+    """
+    Show an ingestion job's progress until it finishes, returning its final
+    status, or None if it is still going after timeout seconds.
+    """
+    progress = st.progress(0.0, text=f"Queued `{source}`...")
+    deadline = time.monotonic() + timeout
+    while True:
+        job = api_job_status(job_id)
+        total = job.get("total_pages") or 0
+        fraction = min(job.get("pages", 0) / total, 1.0) if total else 0.0
+
+        if job["state"] == "done":
+            progress.progress(1.0, text="Done")
+            st.success(
+                f"Embedded `{source}` with {job['chunks']} chunks "
+                f"({job['pages_per_second']} pages/s, {job['chunks_per_second']} chunks/s)."
+            )
+            return job
+        if job["state"] == "failed":
+            progress.empty()
+            st.error(f"Embedding failed: {job.get('error')}")
+            return job
+        if time.monotonic() >= deadline:
+            progress.empty()
+            st.warning(f"`{source}` is still embedding in the background (job `{job_id}`).")
+            return None
+        if job["state"] == "running":
+            progress.progress(
+                fraction,
+                text=f"Page {job['pages']} of {total or '?'} · {job['chunks']} chunks embedded",
+            )
+        time.sleep(JOB_POLL_SECONDS)
+
+
 def api_query(question: str) -> str:
     response = requests.post(QUERY_API, params={"question": question}, timeout=300)
     response.raise_for_status()
@@ -140,8 +190,24 @@ def api_query(question: str) -> str:
     return answer
 
 
-def api_chroma_summary(limit: int = 30) -> dict[str, Any]:
-    response = requests.get(CHROMA_SUMMARY_API, params={"limit": limit}, timeout=120)
+def api_query_stream(question: str) -> Iterator[str]:
+    with requests.post(
+        QUERY_STREAM_API,
+        params={"question": question},
+        stream=True,
+        timeout=(10, 300),
+    ) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        for text in response.iter_content(chunk_size=None, decode_unicode=True):
+            if text:
+                yield text
+
+
+def api_chroma_summary(limit: int = 30, offset: int = 0) -> dict[str, Any]:
+    response = requests.get(
+        CHROMA_SUMMARY_API, params={"limit": limit, "offset": offset}, timeout=120
+    )
     response.raise_for_status()
     return response.json()
 